@@ -2,3 +2,7 @@ from ._version import get_versions
 __version__ = get_versions()['version']
 del get_versions
 
+from engarde.options import (disable, disabled, enable, enabled, is_enabled,
+                             get_n_jobs, set_n_jobs)
+from engarde._background import background, wait
+from engarde.schema import Column, Schema
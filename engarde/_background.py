@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""
+Checks run in the background.
+
+A check called with ``mode='background'`` (or inside an
+``engarde.background()`` block) returns its input immediately and runs on
+a shared thread pool. Its failure is raised at the next sync point:
+
+- ``engarde.wait()``, which waits for all pending checks,
+- the next call of a function decorated by ``engarde.decorators``, which
+  raises failures of checks that have already finished,
+- the end of an ``engarde.background()`` block, which waits.
+
+Pending checks belong to the context (thread, asyncio task, or
+``background()`` block) that submitted them, and are only raised at its
+sync points. If several checks failed, a single ``ValidationError``
+listing all of them is raised, with the individual exceptions in its
+``errors`` attribute. The checked frame must not be modified in place
+before the sync point.
+"""
+import contextlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait as _wait_all
+from contextvars import ContextVar
+from functools import wraps
+
+from engarde import options
+from engarde.exceptions import ValidationError
+
+_MODES = (None, 'sync', 'background')
+
+# default mode of checks called without ``mode``
+_mode = ContextVar('engarde_mode', default=None)
+
+_lock = threading.Lock()
+_executor = None
+# futures of the checks submitted in the current context, in submission order
+_pending = ContextVar('engarde_pending', default=None)
+
+
+def validate_mode(mode):
+    if mode not in _MODES:
+        msg = "Parameter 'mode' must be one of {!r}, was {!r}"
+        raise ValueError(msg.format(_MODES, mode))
+    return mode
+
+
+def in_background(mode):
+    """Whether a check called with ``mode`` runs in the background."""
+    return validate_mode(mode if mode is not None else _mode.get()) == 'background'
+
+
+def _pool():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(thread_name_prefix='engarde')
+        return _executor
+
+
+def _pending_futures():
+    pending = _pending.get()
+    if pending is None:
+        pending = []
+        _pending.set(pending)
+    return pending
+
+
+def submit(func, *args, **kwargs):
+    """Run ``func(*args, **kwargs)`` on the pool, raising its error at a sync point."""
+    future = _pool().submit(func, *args, **kwargs)
+    with _lock:
+        _pending_futures().append(future)
+    return future
+
+
+def raise_failures(block=False):
+    """
+    Raise the errors of the finished background checks of the current
+    context. With ``block``, wait for all of them first.
+    """
+    pending = _pending.get()
+    if not pending:
+        return
+    with _lock:
+        if block:
+            futures, pending[:] = list(pending), []
+        else:
+            futures, running = [], []
+            for future in pending:
+                (futures if future.done() else running).append(future)
+            pending[:] = running
+    _wait_all(futures)
+    errors = [future.exception() for future in futures if future.exception() is not None]
+    if len(errors) == 1:
+        raise errors[0]
+    if errors:
+        msg = "{} background checks failed:\n{}".format(
+            len(errors), "\n".join("- {}".format(exc) for exc in errors))
+        exc = ValidationError(msg)
+        exc.errors = errors
+        raise exc from errors[0]
+
+
+def wait():
+    """Wait for the background checks of the current context, and raise their failures."""
+    raise_failures(block=True)
+
+
+@contextlib.contextmanager
+def synchronous():
+    """Run checks called without ``mode`` immediately inside the block."""
+    token = _mode.set(None)
+    try:
+        yield
+    finally:
+        _mode.reset(token)
+
+
+@contextlib.contextmanager
+def background():
+    """
+    Run checks called without ``mode`` in the background inside the block,
+    and wait for the background checks submitted in it when it exits.
+    """
+    token, pending = _mode.set('background'), _pending.set([])
+    try:
+        yield
+    finally:
+        try:
+            wait()
+        finally:
+            _pending.reset(pending)
+            _mode.reset(token)
+
+
+def deferrable(check):
+    """
+    Add a ``mode`` keyword to ``check``: ``'sync'`` runs it immediately,
+    ``'background'`` on the pool. The default is set by ``background()``.
+    While engarde is disabled, the wrapper returns ``df`` without calling
+    ``check``, so checks need not test ``options._enabled`` themselves.
+    """
+    @wraps(check)
+    def wrapper(df, *args, mode=None, **kwargs):
+        if not options._enabled:
+            return df
+        if in_background(mode):
+            submit(check, df, *args, **kwargs)
+            return df
+        if _mode.get() is not None:  # checks called by this one run immediately too
+            with synchronous():
+                return check(df, *args, **kwargs)
+        return check(df, *args, **kwargs)
+    return wrapper
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+Intermediate results shared between checks run on the same DataFrame.
+
+While a ``FrameCache`` is active (see ``generic.shared_intermediates``),
+checks look up per-column null masks, reductions and factorizations in it
+instead of recomputing them, so a group of checks computes each of these
+once per column.
+"""
+import contextlib
+from contextvars import ContextVar
+
+import numpy as np
+import pandas as pd
+
+_active = ContextVar('engarde_frame_cache', default=None)
+
+
+class FrameCache(object):
+    """
+    Lazily computed per-column intermediates of ``df``.
+
+    Parameters
+    ==========
+    df : DataFrame
+    """
+
+    def __init__(self, df):
+        self.df = df
+        self._isnull = {}
+        self._reductions = {}
+        self._factorized = {}
+
+    def isnull(self, col):
+        """Boolean ndarray, True where ``df[col]`` is missing."""
+        if col not in self._isnull:
+            self._isnull[col] = self.df[col].isnull().values
+        return self._isnull[col]
+
+    def reduce(self, name, columns):
+        """
+        ``getattr(df[columns], name)()`` as a Series, e.g. ``'min'``. Columns
+        not reduced before are reduced together in one call if they are all
+        of df's columns, and one by one otherwise, so that no subset of the
+        frame is copied. Columns the reduction doesn't apply to are NaN.
+        """
+        columns = list(columns)
+        missing = [col for col in columns if (name, col) not in self._reductions]
+        if missing and missing == list(self.df.columns):
+            result = getattr(self.df, name)()
+            for col in missing:
+                self._reductions[name, col] = result.get(col, np.nan)
+        else:
+            for col in missing:
+                try:
+                    self._reductions[name, col] = getattr(self.df[col], name)()
+                except TypeError:
+                    self._reductions[name, col] = np.nan
+        values = [self._reductions[name, col] for col in columns]
+        if not values:
+            return pd.Series(values, index=columns, dtype=object)
+        return pd.Series(values, index=columns)
+
+    def factorize(self, col):
+        """``pd.factorize(df[col])``: codes (-1 for missing) and uniques."""
+        if col not in self._factorized:
+            self._factorized[col] = pd.factorize(self.df[col])
+        return self._factorized[col]
+
+
+def current(df):
+    """The active FrameCache for ``df``, or None."""
+    cache = _active.get()
+    if cache is not None and cache.df is df:
+        return cache
+    return None
+
+
+@contextlib.contextmanager
+def activate(df):
+    """Make a FrameCache for ``df`` active in the current context."""
+    cache = current(df)
+    if cache is not None:  # already sharing, e.g. nested plans
+        yield cache
+        return
+    cache = FrameCache(df)
+    token = _active.set(cache)
+    try:
+        yield cache
+    finally:
+        _active.reset(token)
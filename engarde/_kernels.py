@@ -0,0 +1,409 @@
+# -*- coding: utf-8 -*-
+"""
+Array kernels used by the checks.
+
+The functions in here work on the values of a single column and return
+positions rather than booleans, so the checks can report where a
+violation happened without making a second pass over the data.
+
+With ``n_jobs``, long columns are scanned in contiguous chunks on several
+threads (see ``_parallel.map_chunks``) and the per-chunk results combined.
+"""
+import threading
+import warnings
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_bool_dtype, is_categorical_dtype, is_object_dtype
+
+from engarde import _numba, _parallel
+
+# number of elements compared at a time by the blockwise kernels
+_BLOCK = 1 << 16
+
+_iNaT = np.iinfo(np.int64).min
+
+
+def comparable(series):
+    """
+    Return the values of ``series`` as an ndarray suited for ordering
+    comparisons, together with a boolean mask of missing values (or None
+    if the values can't be missing).
+
+    Datetime-likes are viewed as int64 and categoricals as their codes,
+    so neither is copied.
+    """
+    values = series.array
+    if hasattr(values, 'asi8'):  # datetime, timedelta and period
+        arr = values.asi8
+        return arr, arr == _iNaT
+    if is_categorical_dtype(series.dtype):
+        arr = values.codes
+        return arr, arr == -1
+    arr = series.values
+    if isinstance(arr, np.ndarray):
+        if is_bool_dtype(arr.dtype):
+            return arr.view(np.int8), None
+        if is_object_dtype(arr.dtype):
+            return arr, pd.isnull(arr)
+        if arr.dtype.kind in 'fc':
+            return arr, np.isnan(arr)
+        return arr, None
+    return np.asarray(series.to_numpy(dtype=object)), series.isnull().values
+
+
+def _direction(arr):
+    """
+    Return True if the first change in ``arr`` is an increase, False if it
+    is a decrease and None if all elements are equal.
+    """
+    for start in range(0, len(arr) - 1, _BLOCK):
+        chunk = arr[start:start + _BLOCK + 1]
+        changed = np.flatnonzero(chunk[1:] != chunk[:-1])
+        if len(changed):
+            i = changed[0]
+            return bool(chunk[i + 1] > chunk[i])
+    return None
+
+
+def _first_unordered(arr, increasing, strict):
+    for start in range(0, len(arr) - 1, _BLOCK):
+        chunk = arr[start:start + _BLOCK + 1]
+        prev, nxt = chunk[:-1], chunk[1:]
+        try:
+            if increasing:
+                ok = nxt > prev if strict else nxt >= prev
+            else:
+                ok = nxt < prev if strict else nxt <= prev
+        except TypeError:  # unorderable objects
+            return start + 1
+        if not ok.all():
+            return start + int(np.argmin(ok)) + 1
+    return -1
+
+
+def _first_unordered_chunked(arr, increasing, strict, n_jobs):
+    def scan(start, stop):
+        # each chunk also compares its last element with the next chunk's first
+        position = _first_unordered(arr[start:stop + 1], increasing, strict)
+        return position if position == -1 else start + position
+
+    for position in _parallel.map_chunks(scan, len(arr), n_jobs):
+        if position != -1:
+            return position
+    return -1
+
+
+def monotonic_violation(series, increasing=None, strict=False, engine=None, n_jobs=None):
+    """
+    Find the first element of ``series`` that breaks monotonicity.
+
+    Parameters
+    ==========
+    series : Series
+    increasing : None or bool
+        None detects the direction from the first change in value.
+    strict : bool
+        Whether equal consecutive values are a violation.
+    engine : None or 'numba'
+        Scan numeric columns with a numba-compiled loop.
+    n_jobs : int or None
+        Number of threads scanning chunks of a long column.
+
+    Returns
+    =======
+    position : int
+        Position of the first violating element, -1 if ``series`` is
+        monotonic. Missing values are always a violation.
+    """
+    arr, missing = comparable(series)
+    first_missing = -1
+    if missing is not None and missing.any():
+        first_missing = int(np.argmax(missing))
+        arr = arr[:first_missing]
+    if _numba.validate_engine(engine) and arr.dtype.kind in 'iuf':
+        position = _numba.monotonic_violation(arr, increasing, strict)
+        return position if position != -1 else first_missing
+    if increasing is None:
+        try:
+            increasing = _direction(arr)
+        except TypeError:
+            return 1
+        if increasing is None:  # constant
+            if strict and len(arr) > 1:
+                return 1
+            return first_missing
+    position = _first_unordered_chunked(arr, increasing, strict, n_jobs)
+    return position if position != -1 else first_missing
+
+
+def find(values, predicate, limit=None, n_jobs=None):
+    """
+    Find the elements of ``values`` for which ``predicate`` is true.
+
+    Parameters
+    ==========
+    values : ndarray or ExtensionArray
+    predicate : callable
+        Takes a slice of ``values`` and returns a boolean ndarray.
+    limit : int or None
+        Maximum number of positions to return.
+    n_jobs : int or None
+        Number of threads scanning chunks of ``values``.
+
+    Returns
+    =======
+    count : int
+        Number of elements for which ``predicate`` is true.
+    positions : ndarray
+        Positions of the first ``limit`` of them.
+    """
+    def scan(start, stop):
+        hits = np.flatnonzero(predicate(values[start:stop]))
+        return len(hits), hits[:limit] + start
+
+    parts = _parallel.map_chunks(scan, len(values), n_jobs)
+    count = sum(n for n, _ in parts)
+    positions = np.concatenate([hits for _, hits in parts])[:limit]
+    return count, positions
+
+
+def _nan_minmax(arr):
+    with warnings.catch_warnings():  # all-NaN slices
+        warnings.simplefilter('ignore', RuntimeWarning)
+        return np.nanmin(arr), np.nanmax(arr)
+
+
+def _chunked_minmax(arr, n_jobs):
+    parts = _parallel.map_chunks(lambda start, stop: _nan_minmax(arr[start:stop]),
+                                 len(arr), n_jobs)
+    mins, maxs = np.array(parts).T
+    return _nan_minmax(mins)[0], _nan_minmax(maxs)[1]
+
+
+def first_duplicate(series, assume_sorted=False, engine=None):
+    """
+    Find the first element of ``series`` that repeats an earlier element.
+
+    Parameters
+    ==========
+    series : Series
+    assume_sorted : bool
+        If True, ``series`` is known to be sorted, so duplicates are
+        adjacent and are found by comparing neighbouring values.
+    engine : None or 'numba'
+        Find duplicates of numeric columns with a numba-compiled loop over a
+        hash set, which stops at the first duplicate.
+
+    Returns
+    =======
+    position : int
+        Position of the first duplicate, -1 if all values are unique.
+
+    Notes
+    =====
+    Without ``assume_sorted``, growing prefixes of ``series`` are hashed
+    until a duplicate is found, so an early duplicate is found without
+    hashing the whole column.
+    """
+    if _numba.validate_engine(engine) and not assume_sorted:
+        arr, _ = comparable(series)
+        if arr.dtype.kind in 'iuf':
+            return _numba.first_duplicate(arr)
+    if assume_sorted:
+        arr, missing = comparable(series)
+        second_missing = -1
+        if missing is not None:
+            missing_positions = np.flatnonzero(missing)[:2]
+            if len(missing_positions) == 2:
+                second_missing = int(missing_positions[1])
+        for start in range(0, len(arr) - 1, _BLOCK):
+            chunk = arr[start:start + _BLOCK + 1]
+            equal = chunk[1:] == chunk[:-1]
+            if missing is not None:
+                equal &= ~missing[start + 1:start + _BLOCK + 1]
+            if equal.any():
+                position = start + int(np.argmax(equal)) + 1
+                if second_missing != -1:
+                    return min(position, second_missing)
+                return position
+        return second_missing
+
+    n, stop = len(series), _BLOCK
+    while True:
+        stop = min(stop, n)
+        duplicated = series.iloc[:stop].duplicated().values
+        if duplicated.any():
+            return int(np.argmax(duplicated))
+        if stop == n:
+            return -1
+        stop *= 8
+
+
+def dtypes_identical(left, right):
+    """
+    Whether two dtypes are equal, including the order of the categories of
+    categorical dtypes (unordered categoricals compare equal without it).
+    """
+    if left != right:
+        return False
+    if is_categorical_dtype(left):
+        return left.categories.equals(right.categories)
+    return True
+
+
+def arrays_equal(left, right):
+    """
+    Whether two Series hold exactly the same values and dtype, treating
+    missing values in the same position as equal. The index is ignored.
+    """
+    if not dtypes_identical(left.dtype, right.dtype) or len(left) != len(right):
+        return False
+    a, b = left.values, right.values
+    if isinstance(a, np.ndarray) and isinstance(b, np.ndarray) and a.dtype != object:
+        if a.dtype.kind in 'fc':
+            return bool(np.array_equal(a, b, equal_nan=True))
+        if a.dtype.kind in 'mM':
+            return bool(np.array_equal(a.view(np.int64), b.view(np.int64)))
+        return bool(np.array_equal(a, b))
+    return bool(left.array.equals(right.array))
+
+
+def minmax(frame, columns=None, engine=None, n_jobs=None):
+    """
+    Minima and maxima of the ``columns`` of ``frame`` (default all) as two
+    Series. A subset of the columns is reduced column by column, without
+    copying it out of the frame. With ``engine='numba'``, numeric columns
+    are reduced in a single compiled pass each. With ``n_jobs``, columns
+    are reduced on that many threads, and long numeric columns in chunks
+    combined into a single min and max.
+    """
+    use_numba = _numba.validate_engine(engine)
+    columns = frame.columns if columns is None else list(columns)
+    if (not use_numba and _parallel.resolve_n_jobs(n_jobs) == 1
+            and list(columns) == list(frame.columns)):
+        return frame.min(), frame.max()
+
+    def reduce(col):
+        arr = frame[col].values
+        numeric = isinstance(arr, np.ndarray) and arr.dtype.kind in 'iuf'
+        if use_numba and numeric:
+            return _numba.minmax(arr)
+        if numeric and _parallel.n_chunks(len(arr), n_jobs) > 1:
+            return _chunked_minmax(arr, n_jobs)
+        return frame[col].min(), frame[col].max()
+
+    results = _parallel.map_columns(reduce, columns, n_jobs)
+    mins = {col: lo for col, (lo, _) in zip(columns, results)}
+    maxs = {col: hi for col, (_, hi) in zip(columns, results)}
+    return pd.Series(mins, dtype=object), pd.Series(maxs, dtype=object)
+
+
+def conflicting_keys(keys, values, limit=None):
+    """
+    Find the keys that are associated with more than one distinct value.
+
+    The distinct (key, value) pairs of the factorized columns are found
+    with a single hash-based pass, so this is linear in the number of rows.
+    Missing keys are ignored, missing values count as a value.
+
+    Parameters
+    ==========
+    keys : tuple
+        ``pd.factorize`` of the key column.
+    values : tuple
+        ``pd.factorize`` of the value column.
+    limit : int or None
+        Maximum number of conflicting keys to return values for.
+
+    Returns
+    =======
+    n_bad : int
+        Number of keys with more than one value.
+    conflicts : list of (key, list of values) tuples
+        The first ``limit`` conflicting keys and their distinct values.
+    """
+    key_codes, key_uniques = keys
+    value_codes, value_uniques = values
+    n_values = len(value_uniques) + 1
+    value_codes = np.where(value_codes == -1, n_values - 1, value_codes)
+
+    present = key_codes != -1
+    pairs = key_codes[present].astype(np.int64) * n_values + value_codes[present]
+    pairs = pd.unique(pairs)
+    pair_keys = pairs // n_values
+    counts = np.bincount(pair_keys, minlength=len(key_uniques))
+    bad = np.flatnonzero(counts > 1)
+
+    conflicts = []
+    for code in bad[:limit]:
+        codes = pairs[pair_keys == code] % n_values
+        found = [value_uniques[c] if c < n_values - 1 else np.nan for c in codes]
+        conflicts.append((key_uniques[code], found))
+    return len(bad), conflicts
+
+
+# buffer key -> (weakref to the buffer's base array, inferred dtype string)
+_infer_cache = OrderedDict()
+_INFER_CACHE_SIZE = 256
+# has_dtypes infers columns on several threads
+_infer_lock = threading.Lock()
+
+
+def _buffer_key(arr):
+    """Return a key identifying the memory of ``arr`` and the array owning it."""
+    base = arr
+    while isinstance(base.base, np.ndarray):
+        base = base.base
+    key = (id(base), arr.__array_interface__['data'][0], arr.shape, arr.strides)
+    return key, base
+
+
+def infer_dtype(series, sample=None, seed=0, cache=False):
+    """
+    ``pd.api.types.infer_dtype`` of ``series``, optionally on a sample and
+    cached on the column's underlying buffer.
+
+    Parameters
+    ==========
+    series : Series
+    sample : int or None
+        Infer on at most this many randomly chosen rows.
+    seed : int or None
+        Seed of the sample. Results are only cached for a fixed seed.
+    cache : bool
+        Reuse a previous result for the same buffer. The cache is only used
+        for object arrays, as inference is free for other dtypes. Changes
+        made to the buffer in place are not detected.
+
+    Returns
+    =======
+    str
+    """
+    values = series.values
+    if not (isinstance(values, np.ndarray) and values.dtype == object):
+        return pd.api.types.infer_dtype(values)
+
+    key = None
+    if cache and (sample is None or seed is not None):
+        key, base = _buffer_key(values)
+        key += (sample, seed if sample is not None else None)
+        with _infer_lock:
+            entry = _infer_cache.get(key)
+            if entry is not None and entry[0]() is base:
+                _infer_cache.move_to_end(key)
+                return entry[1]
+
+    if sample is not None and len(values) > sample:
+        positions = np.random.RandomState(seed).choice(len(values), sample, replace=False)
+        values = values[np.sort(positions)]
+    result = pd.api.types.infer_dtype(values)
+
+    if key is not None:
+        with _infer_lock:
+            _infer_cache[key] = (weakref.ref(base), result)
+            if len(_infer_cache) > _INFER_CACHE_SIZE:
+                _infer_cache.popitem(last=False)
+    return result
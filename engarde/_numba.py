@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""
+Numba-compiled versions of the row/column predicates and of the kernels
+in ``_kernels``, used when a check is called with ``engine='numba'``.
+
+numba is an optional dependency and is only imported when one of these
+functions is first called. Compiled functions are cached per predicate,
+and numba itself caches one specialization per dtype signature, so
+repeated calls (e.g. from a decorator) only pay for compilation once.
+"""
+import weakref
+from collections import namedtuple
+
+import numpy as np
+
+_ENGINES = (None, 'python', 'numba')
+
+
+def validate_engine(engine):
+    if engine not in _ENGINES:
+        msg = "Parameter 'engine' must be one of {!r}, was {!r}"
+        raise ValueError(msg.format(_ENGINES, engine))
+    return engine == 'numba'
+
+
+def _numba():
+    try:
+        import numba
+    except ImportError:
+        raise ImportError("engine='numba' requires numba to be installed")
+    return numba
+
+
+# predicate -> jitted predicate
+_jitted = weakref.WeakKeyDictionary()
+# predicate -> {column names: compiled row loop}
+_row_loops = weakref.WeakKeyDictionary()
+# name -> compiled kernel
+_kernels = {}
+
+
+def jit(func):
+    """Return ``func`` compiled in nopython mode, cached per ``func``."""
+    numba = _numba()
+    if isinstance(func, numba.core.registry.CPUDispatcher):
+        return func
+    try:
+        return _jitted[func]
+    except KeyError:
+        compiled = _jitted[func] = numba.njit(func)
+        return compiled
+
+
+def _row_loop(func, names):
+    loops = _row_loops.setdefault(func, {})
+    if names in loops:
+        return loops[names]
+
+    numba = _numba()
+    row_type = namedtuple('Row', names, rename=True)
+    args = ', '.join('c{}'.format(i) for i in range(len(names)))
+    fields = ', '.join('c{}[i]'.format(i) for i in range(len(names)))
+    source = (
+        "def loop(out, args, {args}):\n"
+        "    for i in range(len(out)):\n"
+        "        out[i] = predicate(Row({fields}), *args)\n"
+    ).format(args=args, fields=fields)
+    namespace = {'predicate': jit(func), 'Row': row_type}
+    exec(source, namespace)
+    loop = loops[names] = numba.njit(namespace['loop'])
+    return loop
+
+
+def evaluate_rows(df, func, *args):
+    """
+    Evaluate the row predicate ``func(row, *args)`` for each row of ``df``
+    in compiled code. ``row`` is a namedtuple of the row's values, so
+    columns are accessed as attributes, e.g. ``row.A > row.B``. Object
+    columns are not available to the predicate.
+
+    Returns
+    =======
+    ndarray of bool, one value per row.
+    """
+    columns = [(name, df[name].values) for name in df.columns
+               if isinstance(df[name].values, np.ndarray) and df[name].dtype != object]
+    names = tuple(str(name) for name, _ in columns)
+    loop = _row_loop(func, names)
+    out = np.empty(len(df), dtype=np.bool_)
+    loop(out, tuple(args), *[values for _, values in columns])
+    return out
+
+
+def evaluate_columns(df, func, *args):
+    """
+    Evaluate ``func(values, *args)`` for each column of ``df`` in compiled
+    code, where ``values`` is the column's ndarray.
+
+    Returns
+    =======
+    list of results, one per column.
+    """
+    compiled = jit(func)
+    return [compiled(np.asarray(df[name].values), *args) for name in df.columns]
+
+
+def _kernel(name):
+    if name not in _kernels:
+        numba = _numba()
+        _kernels[name] = numba.njit(globals()['_py_' + name])
+    return _kernels[name]
+
+
+def _py_first_unordered(arr, increasing, strict):
+    for i in range(1, len(arr)):
+        a, b = arr[i - 1], arr[i]
+        if increasing:
+            ok = b > a if strict else b >= a
+        else:
+            ok = b < a if strict else b <= a
+        if not ok:
+            return i
+    return -1
+
+
+def _py_direction(arr):
+    for i in range(1, len(arr)):
+        if arr[i] != arr[i - 1]:
+            return 1 if arr[i] > arr[i - 1] else 0
+    return -1
+
+
+def _py_minmax(arr):
+    # positions rather than values, so that no NaN seed turns integers into floats
+    lo = hi = -1
+    for i in range(len(arr)):
+        x = arr[i]
+        if x != x:  # NaN
+            continue
+        if lo == -1:
+            lo = hi = i
+        elif x < arr[lo]:
+            lo = i
+        elif x > arr[hi]:
+            hi = i
+    return lo, hi
+
+
+def _py_first_duplicate(arr):
+    seen = set()
+    seen_nan = False
+    for i in range(len(arr)):
+        x = arr[i]
+        if x != x:
+            if seen_nan:
+                return i
+            seen_nan = True
+        elif x in seen:
+            return i
+        else:
+            seen.add(x)
+    return -1
+
+
+def monotonic_violation(arr, increasing, strict):
+    """Compiled equivalent of ``_kernels._first_unordered`` with direction detection."""
+    if increasing is None:
+        direction = _kernel('direction')(arr)
+        if direction == -1:
+            return 1 if strict and len(arr) > 1 else -1
+        increasing = direction == 1
+    return int(_kernel('first_unordered')(arr, increasing, strict))
+
+
+def minmax(arr):
+    """Minimum and maximum of a numeric array, skipping NaN."""
+    lo, hi = _kernel('minmax')(arr)
+    if lo == -1:
+        return np.nan, np.nan
+    return arr[lo], arr[hi]
+
+
+def first_duplicate(arr):
+    """Position of the first repeated value of a numeric array, -1 if none."""
+    return int(_kernel('first_duplicate')(arr))
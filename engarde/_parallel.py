@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+"""
+Parallel execution of checks.
+
+Per-column work is spread over a shared thread pool (``map_columns``), as
+the NumPy and pandas kernels the checks use release the GIL. Long columns
+are also split into contiguous row chunks scanned in parallel
+(``map_chunks``), whose partial results the kernels then combine.
+
+Row predicates that cannot be vectorized are run on a process pool. The
+numeric columns are copied once into ``multiprocessing.shared_memory``
+segments that the workers map, so the frame itself is never pickled; only
+object columns and the index are sent, in per-task slices.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:  # Python < 3.8
+    shared_memory = None
+
+from engarde import options
+
+# number of row ranges per worker, to even out uneven predicate costs
+_TASKS_PER_WORKER = 4
+
+# minimum number of rows per chunk of a column scanned in parallel
+_MIN_CHUNK = 1 << 18
+
+_lock = threading.Lock()
+# held for a whole evaluation, so no evaluation forks while another one's
+# threads hold locks (e.g. the resource tracker's, or a pool's queues)
+_fork_lock = threading.Lock()
+_threads = None
+# marks the pool's threads, which run nested column maps serially
+_local = threading.local()
+
+# (func, args, kwargs) evaluated by a worker process, set by its initializer
+_task = None
+
+
+def resolve_n_jobs(n_jobs):
+    """Number of threads to use for ``n_jobs``, None meaning the global default."""
+    if n_jobs is None:
+        n_jobs = options._n_jobs
+    if n_jobs == -1:
+        return os.cpu_count() or 1
+    if n_jobs < 1:
+        raise ValueError("n_jobs must be a positive number or -1, was {!r}".format(n_jobs))
+    return n_jobs
+
+
+def _thread_pool():
+    global _threads
+    with _lock:
+        if _threads is None:
+            _threads = ThreadPoolExecutor(os.cpu_count() or 1,
+                                          thread_name_prefix='engarde-columns')
+        return _threads
+
+
+def _map_batch(func, items):
+    _local.in_pool = True
+    try:
+        return [func(item) for item in items]
+    finally:
+        _local.in_pool = False
+
+
+def map_columns(func, columns, n_jobs=None):
+    """
+    ``[func(col) for col in columns]``, computed on up to ``n_jobs`` threads.
+
+    The columns are split into contiguous batches, one per thread, and the
+    results are returned in the order of ``columns`` whatever the order in
+    which they finish. If ``func`` raises, the exception of the first
+    column (in order) that raised is raised.
+    """
+    columns = list(columns)
+    n_jobs = min(resolve_n_jobs(n_jobs), len(columns))
+    if n_jobs <= 1 or getattr(_local, 'in_pool', False):
+        return [func(col) for col in columns]
+    bounds = np.linspace(0, len(columns), n_jobs + 1).astype(int)
+    pool = _thread_pool()
+    futures = [pool.submit(_map_batch, func, columns[start:stop])
+               for start, stop in zip(bounds[:-1], bounds[1:])]
+    results = []
+    for future in futures:
+        results.extend(future.result())
+    return results
+
+
+def n_chunks(n_rows, n_jobs=None):
+    """Number of row chunks ``map_chunks`` splits ``n_rows`` rows into."""
+    if getattr(_local, 'in_pool', False):
+        return 1
+    return max(1, min(resolve_n_jobs(n_jobs), n_rows // _MIN_CHUNK))
+
+
+def _call(func, *args):
+    _local.in_pool = True
+    try:
+        return func(*args)
+    finally:
+        _local.in_pool = False
+
+
+def map_chunks(func, n_rows, n_jobs=None):
+    """
+    ``[func(start, stop) for each chunk]``, where the chunks are contiguous
+    row ranges covering ``n_rows`` rows, computed on up to ``n_jobs``
+    threads. Columns are only split if each chunk gets at least
+    ``_MIN_CHUNK`` rows. The results are in row order.
+    """
+    n = n_chunks(n_rows, n_jobs)
+    if n == 1:
+        return [func(0, n_rows)]
+    bounds = np.linspace(0, n_rows, n + 1).astype(int)
+    pool = _thread_pool()
+    futures = [pool.submit(_call, func, start, stop)
+               for start, stop in zip(bounds[:-1], bounds[1:])]
+    return [future.result() for future in futures]
+
+
+def _init_worker(task):
+    global _task
+    _task = task
+
+
+def _evaluate_chunk(specs, n_rows, start, stop, index, objects):
+    func, args, kwargs = _task
+    handles, data = [], {}
+    try:
+        for i, (shm_name, dtype) in enumerate(specs):
+            if shm_name is None:
+                data[i] = objects[i]
+            else:
+                shm = shared_memory.SharedMemory(name=shm_name)
+                handles.append(shm)
+                data[i] = np.ndarray((n_rows,), dtype=dtype, buffer=shm.buf)[start:stop]
+        chunk = pd.DataFrame(data, index=index, copy=True)
+    finally:
+        data = None
+        for shm in handles:
+            shm.close()
+    chunk.columns = objects['columns']
+    result = chunk.agg(func, 1, *args, **kwargs)
+    return np.asarray(result, dtype=bool)
+
+
+def evaluate_rows(df, func, workers, *args, **kwargs):
+    """
+    Evaluate the row predicate ``func(row, *args, **kwargs)`` on ``workers``
+    processes.
+
+    On platforms that can fork, ``func`` is inherited by the workers and
+    does not need to be picklable; otherwise it is pickled once per worker.
+    Only columns with a NumPy dtype are shared; extension dtypes (e.g.
+    tz-aware datetimes) are sent with each task so they keep their type.
+
+    Forking a process with other running threads can deadlock the workers
+    if one of those threads holds a lock the workers need at that moment.
+    Evaluations are serialized with each other, but other threads,
+    including engarde's column and background pools running other checks,
+    are not paused. Only use ``workers=`` when no other thread may be
+    importing modules, logging or creating shared memory at the same time.
+
+    Returns
+    =======
+    ndarray of bool, one value per row.
+    """
+    if shared_memory is None:
+        raise RuntimeError("workers= requires Python 3.8 or later")
+    with _fork_lock:
+        return _evaluate_rows(df, func, workers, *args, **kwargs)
+
+
+def _evaluate_rows(df, func, workers, *args, **kwargs):
+    n_rows = len(df)
+    segments, specs, objects = [], [], {}
+    try:
+        for i in range(df.shape[1]):
+            column = df.iloc[:, i]
+            values = column.values
+            if isinstance(column.dtype, np.dtype) and column.dtype.kind in 'biufcmM':
+                shm = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+                segments.append(shm)
+                np.ndarray(values.shape, dtype=values.dtype, buffer=shm.buf)[:] = values
+                specs.append((shm.name, values.dtype.str))
+            else:
+                objects[i] = column.array
+                specs.append((None, None))
+
+        task = (func, args, kwargs)
+        n_tasks = max(1, min(n_rows, workers * _TASKS_PER_WORKER))
+        bounds = np.linspace(0, n_rows, n_tasks + 1).astype(int)
+        context = None
+        if 'fork' in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context('fork')
+        with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker,
+                                 initargs=(task,)) as pool:
+            futures = []
+            for start, stop in zip(bounds[:-1], bounds[1:]):
+                sliced = {i: values[start:stop] for i, values in objects.items()}
+                sliced['columns'] = df.columns
+                futures.append(pool.submit(_evaluate_chunk, specs, n_rows, start, stop,
+                                           df.index[start:stop], sliced))
+            results = [future.result() for future in futures]
+    finally:
+        for shm in segments:
+            shm.close()
+            shm.unlink()
+    return np.concatenate(results) if results else np.ones(0, dtype=bool)
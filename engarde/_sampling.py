@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+Checking a random sample of rows instead of the whole frame.
+
+A check called with ``sample=`` runs on a random (optionally stratified)
+subset of the rows. If it passes, an upper confidence bound on the
+fraction of failing rows in the whole frame is logged to the ``engarde``
+logger (only for checks that test each row on its own; a sample of a
+column without duplicates says little about the whole column); if it fails, the error names the sample size, and with
+``escalate=True`` the check is re-run on the whole frame so the error
+reports every violation.
+"""
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger('engarde')
+
+# confidence level of the reported failure rate bound
+_CONFIDENCE = 0.95
+
+
+def sample_size(n_rows, sample):
+    """
+    Number of rows to sample out of ``n_rows``.
+
+    Parameters
+    ==========
+    n_rows : int
+    sample : float or int
+        A fraction of the rows in (0, 1], or a number of rows.
+
+    Returns
+    =======
+    int
+    """
+    if isinstance(sample, (bool, np.bool_)):
+        raise TypeError("Parameter 'sample' must be a fraction or a number of rows")
+    if isinstance(sample, (float, np.floating)):
+        if not 0 < sample <= 1:
+            raise ValueError("A fractional 'sample' must be in (0, 1], was {!r}".format(sample))
+        return min(n_rows, int(np.ceil(sample * n_rows)))
+    if sample < 1:
+        raise ValueError("Parameter 'sample' must be a positive number of rows, "
+                         "was {!r}".format(sample))
+    return min(n_rows, int(sample))
+
+
+def sample_positions(df, size, seed=None, stratify=None):
+    """
+    Sorted positions of ``size`` randomly chosen rows of ``df``.
+
+    With ``stratify``, the rows are sampled from each distinct value of the
+    column ``df[stratify]`` in proportion to its frequency, and at least one
+    row is taken per value, so rare values are always represented.
+    """
+    rng = np.random.RandomState(seed)
+    n_rows = len(df)
+    if stratify is None:
+        return np.sort(rng.choice(n_rows, size, replace=False))
+
+    codes, _ = pd.factorize(df[stratify])
+    order = np.argsort(codes, kind='stable')
+    counts = np.bincount(codes + 1)  # missing values (-1) form their own stratum
+    positions, start = [], 0
+    for count in counts:
+        if count:
+            k = min(count, max(1, int(round(size * count / n_rows))))
+            positions.append(order[start + rng.choice(count, k, replace=False)])
+        start += count
+    return np.sort(np.concatenate(positions))
+
+
+def failure_rate_bound(n_sampled, confidence=_CONFIDENCE):
+    """
+    Upper bound, at ``confidence``, on the fraction of failing rows given
+    that none of ``n_sampled`` randomly sampled rows failed.
+    """
+    if n_sampled == 0:
+        return 1.0
+    return 1 - (1 - confidence) ** (1.0 / n_sampled)
+
+
+def run(check, df, sample, seed=None, stratify=None, escalate=False, *args, per_row=True,
+        **kwargs):
+    """
+    Run ``check(sampled, *args, **kwargs)`` on a row sample of ``df``.
+    ``per_row`` tells whether ``check`` tests each row independently, which
+    the logged failure rate bound assumes.
+
+    Returns
+    =======
+    df : DataFrame
+        same as the input.
+    """
+    n_rows = len(df)
+    size = sample_size(n_rows, sample)
+    if size == n_rows:
+        check(df, *args, **kwargs)
+        return df
+
+    sampled = df.iloc[sample_positions(df, size, seed=seed, stratify=stratify)]
+    n_sampled = len(sampled)
+    try:
+        check(sampled, *args, **kwargs)
+    except AssertionError as exc:
+        if escalate:
+            check(df, *args, **kwargs)
+            return df
+        note = "(in a random sample of {} of {} rows)".format(n_sampled, n_rows)
+        exc.args = ("{} {}".format(exc.args[0], note) if exc.args else note,) + exc.args[1:]
+        raise
+    if per_row:
+        logger.info("%s passed on a random sample of %d of %d rows; failure rate "
+                    "< %.3g%% at %d%% confidence", check.__name__, n_sampled, n_rows,
+                    100 * failure_rate_bound(n_sampled), 100 * _CONFIDENCE)
+    else:
+        logger.info("%s passed on a random sample of %d of %d rows", check.__name__,
+                    n_sampled, n_rows)
+    return df
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""
+Vectorization of row predicates by tracing.
+
+A row predicate such as ``lambda row: row.A > row.B`` is called once with a
+symbolic row. Attribute and item access on the row, and operators applied
+to the result, are recorded as an expression tree, which is then evaluated
+on whole columns. Anything the tracer does not understand (truth testing,
+method calls, builtins that need a concrete value, ...) raises
+``Untraceable``, and the caller falls back to evaluating the predicate row
+by row.
+"""
+import operator
+
+import numpy as np
+import pandas as pd
+
+
+class Untraceable(Exception):
+    """The predicate did something that cannot be recorded symbolically."""
+
+
+class _Expr(object):
+    """A node in a recorded expression."""
+
+    __array_ufunc__ = None  # make NumPy functions fail instead of coercing
+    __hash__ = None
+
+    def evaluate(self, columns):
+        raise NotImplementedError
+
+    def _untraceable(self, *args, **kwargs):
+        raise Untraceable
+
+    __bool__ = __nonzero__ = __len__ = __iter__ = __contains__ = _untraceable
+    __index__ = __int__ = __float__ = __complex__ = _untraceable
+    __str__ = __format__ = __call__ = _untraceable
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        raise Untraceable(name)
+
+
+class _Column(_Expr):
+    def __init__(self, name):
+        self.name = name
+
+    def evaluate(self, columns):
+        return columns[self.name]
+
+    def __repr__(self):
+        return 'Column({!r})'.format(self.name)
+
+
+class _Op(_Expr):
+    def __init__(self, op, operands):
+        self.op = op
+        self.operands = operands
+
+    def evaluate(self, columns):
+        values = [x.evaluate(columns) if isinstance(x, _Expr) else x
+                  for x in self.operands]
+        return self.op(*values)
+
+    def __repr__(self):
+        return '{}{!r}'.format(self.op.__name__, tuple(self.operands))
+
+
+def _binary(op):
+    def method(self, other):
+        return _Op(op, (self, other))
+    return method
+
+
+def _reflected(op):
+    def method(self, other):
+        return _Op(op, (other, self))
+    return method
+
+
+def _unary(op):
+    def method(self):
+        return _Op(op, (self,))
+    return method
+
+
+for _name, _op in [('add', operator.add), ('sub', operator.sub),
+                   ('mul', operator.mul), ('truediv', operator.truediv),
+                   ('floordiv', operator.floordiv), ('mod', operator.mod),
+                   ('pow', operator.pow), ('and', operator.and_),
+                   ('or', operator.or_), ('xor', operator.xor)]:
+    setattr(_Expr, '__{}__'.format(_name), _binary(_op))
+    setattr(_Expr, '__r{}__'.format(_name), _reflected(_op))
+
+for _name, _op in [('lt', operator.lt), ('le', operator.le),
+                   ('gt', operator.gt), ('ge', operator.ge),
+                   ('eq', operator.eq), ('ne', operator.ne)]:
+    setattr(_Expr, '__{}__'.format(_name), _binary(_op))
+
+for _name, _op in [('neg', operator.neg), ('pos', operator.pos),
+                   ('invert', operator.invert), ('abs', operator.abs)]:
+    setattr(_Expr, '__{}__'.format(_name), _unary(_op))
+
+
+class _SymbolicRow(object):
+    """Stands in for the row Series passed to a row predicate."""
+
+    def __init__(self, columns):
+        self._columns = columns
+
+    def _column(self, key):
+        try:
+            found = key in self._columns
+        except TypeError:
+            found = False
+        if not found:
+            raise Untraceable(key)
+        return _Column(key)
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        # Series attributes and methods shadow columns of the same name
+        if name.startswith('_') or hasattr(pd.Series, name):
+            raise Untraceable(name)
+        return self._column(name)
+
+    def __getitem__(self, key):
+        return self._column(key)
+
+    def _untraceable(self, *args, **kwargs):
+        raise Untraceable
+
+    __bool__ = __nonzero__ = __len__ = __iter__ = __contains__ = _untraceable
+    __str__ = __format__ = _untraceable
+    __array_ufunc__ = None
+
+
+def trace(func, columns, *args, **kwargs):
+    """
+    Call ``func(row, *args, **kwargs)`` on a symbolic row and return the
+    recorded expression.
+
+    Raises
+    ======
+    Untraceable
+        If the predicate cannot be recorded, or does not depend on the row.
+    """
+    try:
+        expr = func(_SymbolicRow(columns), *args, **kwargs)
+    except Untraceable:
+        raise
+    except Exception as e:  # e.g. TypeError raised on an unsupported operand
+        raise Untraceable(e)
+    if not isinstance(expr, _Expr):
+        raise Untraceable(expr)
+    return expr
+
+
+def evaluate_rows(df, func, *args, **kwargs):
+    """
+    Evaluate the row predicate ``func`` on whole columns of ``df``.
+
+    Returns
+    =======
+    result : ndarray of bool, one value per row.
+
+    Raises
+    ======
+    Untraceable
+        If ``func`` cannot be vectorized; evaluate it row by row instead.
+    """
+    expr = trace(func, df.columns, *args, **kwargs)
+    columns = _ColumnValues(df)
+    try:
+        with np.errstate(all='ignore'):
+            result = expr.evaluate(columns)
+    except Exception as e:
+        raise Untraceable(e)
+    result = np.asarray(result)
+    if result.shape != (len(df),) or result.dtype.kind not in 'biuf':
+        raise Untraceable(result.dtype)
+    return result.astype(bool, copy=False)
+
+
+class _ColumnValues(object):
+    """Lazily fetched column values, fetched once per column."""
+
+    def __init__(self, df):
+        self._df = df
+        self._values = {}
+
+    def __getitem__(self, name):
+        if name not in self._values:
+            column = self._df[name]
+            if isinstance(column, pd.DataFrame):  # duplicated label
+                raise Untraceable(name)
+            self._values[name] = column.to_numpy()
+        return self._values[name]
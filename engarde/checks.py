@@ -7,17 +7,44 @@ Each function in here should
 - Take a DataFrame as its first argument, maybe optional arguments
 - Makes its assert on the result
 - Return the original DataFrame
+
+Every check also takes a ``mode`` keyword: ``'background'`` returns the
+DataFrame immediately and runs the check on a thread pool, raising a
+failure at the next sync point (see ``engarde.wait``).
 """
+import types
+from collections.abc import Mapping
+
 import numpy as np
 import pandas as pd
-import pandas.util.testing as tm
+from pandas.api.types import is_dtype_equal
+try:
+    from pandas.testing import assert_frame_equal
+except ImportError:  # pandas < 0.20
+    from pandas.util.testing import assert_frame_equal
 import six
 
-from engarde import generic
-from engarde.generic import verify_df, verify_columns, verify_rows
+from engarde import generic, _background, _cache, _kernels, _parallel, _sampling
+from engarde.generic import ValueSet, _MAX_REPORT
+
+verify_df = _background.deferrable(generic.verify_df)
+verify_columns = _background.deferrable(generic.verify_columns)
+verify_rows = _background.deferrable(generic.verify_rows)
+
+
+# possible outputs of ``pd.api.types.infer_dtype``
+_INFER_STRINGS = frozenset([
+    'string', 'unicode', 'bytes',
+    'floating', 'integer', 'mixed-integer',
+    'mixed-integer-float', 'complex', 'categorical',
+    'boolean', 'datetime64', 'datetime',
+    'date', 'timedelta64', 'timedelta',
+    'time', 'period', 'mixed',
+])
 
 
-def none_missing(df, columns=None):
+@_background.deferrable
+def none_missing(df, columns=None, n_jobs=None):
     """
     Asserts that there are no missing values (NaNs) in the DataFrame.
 
@@ -26,24 +53,88 @@ def none_missing(df, columns=None):
     df : DataFrame
     columns : list
       list of columns to restrict the check to
+    n_jobs : int or None
+      Number of threads checking columns, or chunks of long columns, in
+      parallel, -1 for one per CPU. Defaults to
+      ``engarde.options.get_n_jobs()``.
 
     Returns
     -------
     df : DataFrame
       same as the original
+
+    Notes
+    -----
+    The null mask is computed once per column. On failure the message
+    reports the number of missing values per column and the labels of
+    the first few offending rows.
     """
     if columns is None:
         columns = df.columns
-    try:
-        assert not df[columns].isnull().any().any()
-    except AssertionError as e:
-        missing = df[columns].isnull()
-        msg = generic.bad_locations(missing)
-        e.args = msg
-        raise
+    cache = _cache.current(df)
+
+    def check_column(col):
+        if cache is not None:
+            positions = np.flatnonzero(cache.isnull(col))
+            count = len(positions)
+        else:
+            count, positions = _kernels.find(df[col].array, pd.isnull, _MAX_REPORT, n_jobs)
+        if count:
+            first = df.index[positions[:_MAX_REPORT]].tolist()
+            return ("Column {!r} has {} missing value(s), first at rows {!r}"
+                    .format(col, count, first))
+
+    failures = [msg for msg in _parallel.map_columns(check_column, columns, n_jobs) if msg]
+    if failures:
+        raise AssertionError("\n".join(failures))
+    return df
+
+
+@_background.deferrable
+def all_finite(df, columns=None, n_jobs=None):
+    """
+    Asserts that the numeric columns hold no missing or infinite values.
+
+    Parameters
+    ----------
+    df : DataFrame
+    columns : list
+      list of columns to restrict the check to. If None, check the float
+      and complex columns; other numeric columns are always finite.
+    n_jobs : int or None
+      Number of threads checking columns, or chunks of long columns, in
+      parallel, -1 for one per CPU. Defaults to
+      ``engarde.options.get_n_jobs()``.
+
+    Returns
+    -------
+    df : DataFrame
+      same as the original
+    """
+    if columns is None:
+        columns = [col for col, dtype in df.dtypes.items() if dtype.kind in 'fc']
+
+    def check_column(col):
+        values = df[col].values
+        if not (isinstance(values, np.ndarray) and values.dtype.kind in 'biufc'):
+            raise TypeError("Column {!r} is not numeric, has dtype {!r}"
+                            .format(col, df[col].dtype))
+        if values.dtype.kind not in 'fc':
+            return None
+        count, positions = _kernels.find(values, lambda chunk: ~np.isfinite(chunk),
+                                         _MAX_REPORT, n_jobs)
+        if count:
+            first = df.index[positions].tolist()
+            return ("Column {!r} has {} non-finite value(s), first at rows {!r}"
+                    .format(col, count, first))
+
+    failures = [msg for msg in _parallel.map_columns(check_column, columns, n_jobs) if msg]
+    if failures:
+        raise AssertionError("\n".join(failures))
     return df
 
-def is_monotonic(df, items=None, increasing=None, strict=False):
+@_background.deferrable
+def is_monotonic(df, items=None, increasing=None, strict=False, engine=None, n_jobs=None):
     """
     Asserts that the DataFrame is monotonic.
 
@@ -56,34 +147,41 @@ def is_monotonic(df, items=None, increasing=None, strict=False):
     increasing : None or bool
         None is either increasing or decreasing.
     strict : whether the comparison should be strict
+    engine : None or 'numba'
+        Use numba-compiled loops for numeric columns.
+    n_jobs : int or None
+        Number of threads checking columns, or chunks of long columns, in
+        parallel, -1 for one per CPU. Defaults to
+        ``engarde.options.get_n_jobs()``.
 
     Returns
     =======
     df : DataFrame
+
+    Notes
+    =====
+    Each column is checked in a single blockwise pass that stops at the
+    first violation. Datetime-likes are compared as int64 and categoricals
+    by their codes. Missing values are never monotonic.
     """
     if items is None:
         items = {k: (increasing, strict) for k in df}
 
-    for col, (increasing, strict) in items.items():
-        s = pd.Index(df[col])
-        if increasing:
-            good = getattr(s, 'is_monotonic_increasing')
-        elif increasing is None:
-            good = getattr(s, 'is_monotonic') | getattr(s, 'is_monotonic_decreasing')
-        else:
-            good = getattr(s, 'is_monotonic_decreasing')
-        if strict:
-            if increasing:
-                good = good & (s.to_series().diff().dropna() > 0).all()
-            elif increasing is None:
-                good = good & ((s.to_series().diff().dropna() > 0).all() |
-                               (s.to_series().diff().dropna() < 0).all())
-            else:
-                good = good & (s.to_series().diff().dropna() < 0).all()
-        if not good:
-            raise AssertionError
+    def check_column(item):
+        col, (increasing, strict) = item
+        position = _kernels.monotonic_violation(df[col], increasing, strict, engine=engine,
+                                                n_jobs=n_jobs)
+        if position != -1:
+            direction = {True: 'increasing', False: 'decreasing', None: 'monotonic'}
+            msg = "Column {!r} is not {}{}, first violation at row {!r}"
+            raise AssertionError(msg.format(col, direction[increasing],
+                                            ' (strict)' if strict else '',
+                                            df.index[position]))
+
+    _parallel.map_columns(check_column, items.items(), n_jobs)
     return df
 
+@_background.deferrable
 def is_shape(df, shape):
     """
     Asserts that the DataFrame is of a known shape.
@@ -112,7 +210,9 @@ def is_shape(df, shape):
     return df
 
 
-def unique(df, columns=None):
+@_background.deferrable
+def unique(df, columns=None, report=False, assume_sorted=False, engine=None,
+           sample=None, seed=None, stratify=None, escalate=False, n_jobs=None):
     """
     Asserts that columns in the DataFrame only have unique values.
 
@@ -121,20 +221,68 @@ def unique(df, columns=None):
     df : DataFrame
     columns : list or None
       list of columns to restrict the check to. If None, check all columns.
+    report : bool
+      If False, stop at the first duplicate found. If True, check every
+      column and report all duplicated values (capped).
+    assume_sorted : bool
+      Whether the columns are known to be sorted, in which case duplicates
+      are found by comparing neighbouring values instead of hashing.
+    engine : None or 'numba'
+      Use a numba-compiled loop for numeric columns.
+    sample : float, int or None
+      Only check a random sample of the rows: a fraction of the rows, or
+      a number of rows. Duplicates that fall outside the sample are not
+      found. See ``_sampling``.
+    seed : int or None
+      Seed of the random sample.
+    stratify : str or None
+      Column to sample each distinct value of in proportion to its
+      frequency, with at least one row per value.
+    escalate : bool
+      If the sample fails, check all rows to report every violation.
+    n_jobs : int or None
+      Number of threads checking columns in parallel, -1 for one per CPU.
+      Defaults to ``engarde.options.get_n_jobs()``.
 
     Returns
     -------
     df : DataFrame
       same as the original
     """
+    if sample is not None:
+        return _sampling.run(unique, df, sample, seed, stratify, escalate, per_row=False,
+                             columns=columns, report=report, assume_sorted=assume_sorted, engine=engine,
+                             n_jobs=n_jobs)
     if columns is None:
         columns = df.columns
-    for col in columns:
-        if not df[col].is_unique:
-            raise AssertionError("Column {!r} contains non-unique values".format(col))
+    cache = _cache.current(df)
+
+    def check_column(col):
+        s = df[col]
+        if report:
+            duplicated = s[s.duplicated()].unique()
+            if len(duplicated):
+                msg = "Column {!r} contains {} duplicated value(s): {!r}"
+                return msg.format(col, len(duplicated), list(duplicated[:_MAX_REPORT]))
+            return None
+        if cache is not None and not assume_sorted and engine is None:
+            codes, uniques = cache.factorize(col)
+            if len(uniques) == len(codes):
+                return None
+            if len(uniques) == len(codes) - 1 and np.count_nonzero(codes == -1) == 1:
+                return None  # a single missing value
+        position = _kernels.first_duplicate(s, assume_sorted=assume_sorted, engine=engine)
+        if position != -1:
+            msg = "Column {!r} contains non-unique values, first duplicate {!r} at row {!r}"
+            raise AssertionError(msg.format(col, s.iloc[position], df.index[position]))
+
+    failures = [msg for msg in _parallel.map_columns(check_column, columns, n_jobs) if msg]
+    if failures:
+        raise AssertionError("\n".join(failures))
     return df
 
 
+@_background.deferrable
 def unique_index(df):
     """
     Assert that the index is unique
@@ -150,12 +298,16 @@ def unique_index(df):
     try:
         assert df.index.is_unique
     except AssertionError as e:
-        e.args = df.index.get_duplicates()
+        duplicated = df.index[df.index.duplicated()].unique()
+        msg = "Index contains {} duplicated label(s): {!r}"
+        e.args = (msg.format(len(duplicated), duplicated[:_MAX_REPORT].tolist()),)
         raise
     return df
 
 
-def within_set(df, items=None):
+@_background.deferrable
+def within_set(df, items=None, sample=None, seed=None, stratify=None, escalate=False,
+               n_jobs=None):
     """
     Assert that df is a subset of items
 
@@ -164,19 +316,49 @@ def within_set(df, items=None):
     df : DataFrame
     items : dict
       mapping of columns (k) to array-like of values (v) that
-      ``df[k]`` is expected to be a subset of
+      ``df[k]`` is expected to be a subset of. The values may be a
+      precompiled ``generic.ValueSet``, which avoids rebuilding the
+      lookup table on every call.
+    sample : float, int or None
+      Only check a random sample of the rows, a fraction of the rows or a
+      number of rows. See ``unique``.
+    seed : int or None
+    stratify : str or None
+    escalate : bool
+      If the sample fails, check all rows to report every violation.
+    n_jobs : int or None
+      Number of threads checking columns, or chunks of long columns, in
+      parallel, -1 for one per CPU. Defaults to
+      ``engarde.options.get_n_jobs()``.
 
     Returns
     =======
     df : DataFrame
     """
-    for k, v in items.items():
-        if not df[k].isin(v).all():
-            bad = df.loc[~df[k].isin(v), k]
+    if sample is not None:
+        return _sampling.run(within_set, df, sample, seed, stratify, escalate, items,
+                             n_jobs=n_jobs)
+    cache = _cache.current(df)
+
+    def check_column(item):
+        k, v = item
+        allowed = v if isinstance(v, ValueSet) else ValueSet(v)
+        if cache is not None:  # test the distinct values only
+            codes, uniques = cache.factorize(k)
+            found = np.append(allowed.contains(uniques), allowed.has_nan)[codes]
+        else:
+            values = df[k].array
+            found = np.concatenate(_parallel.map_chunks(
+                lambda start, stop: allowed.contains(values[start:stop]), len(values), n_jobs))
+        if not found.all():
+            bad = df[k][~found]
             raise AssertionError('Not in set', bad)
+
+    _parallel.map_columns(check_column, items.items(), n_jobs)
     return df
 
-def within_range(df, items=None):
+@_background.deferrable
+def within_range(df, items=None, engine=None, n_jobs=None):
     """
     Assert that a DataFrame is within a range.
 
@@ -186,18 +368,36 @@ def within_range(df, items=None):
     items : dict
       mapping of columns (k) to a (low, high) tuple (v)
       that ``df[k]`` is expected to be between.
+    engine : None or 'numba'
+      Compute the minima and maxima of numeric columns with numba.
+    n_jobs : int or None
+      Number of threads computing the minima and maxima of columns, or of
+      chunks of long columns, in parallel, -1 for one per CPU. Defaults to
+      ``engarde.options.get_n_jobs()``.
 
     Returns
     =======
     df : DataFrame
+
+    Notes
+    =====
+    The check is decided from the column minima and maxima, computed in
+    one vectorized call when ``items`` covers every column, and column by
+    column otherwise. Row masks are only built for failing columns.
     """
+    cache = _cache.current(df)
+    if cache is not None and engine is None:
+        mins, maxs = cache.reduce('min', items), cache.reduce('max', items)
+    else:
+        mins, maxs = _kernels.minmax(df, items, engine=engine, n_jobs=n_jobs)
     for k, (lower, upper) in items.items():
-        if (lower > df[k]).any() or (upper < df[k]).any():
+        if lower > mins[k] or upper < maxs[k]:
             bad = (lower > df[k]) | (upper < df[k])
             raise AssertionError("Outside range", bad)
     return df
 
-def within_n_std(df, n=3):
+@_background.deferrable
+def within_n_std(df, n=3, means=None, stds=None):
     """
     Assert that every value is within ``n`` standard
     deviations of its column's mean.
@@ -207,21 +407,49 @@ def within_n_std(df, n=3):
     df : DataFame
     n : int
       number of standard deviations from the mean
+    means : Series, dict or None
+      reference mean per column, e.g. from a training set. If None, the
+      means of the numeric columns of ``df`` are used.
+    stds : Series, dict or None
+      reference standard deviation per column. If None, the standard
+      deviations of ``df`` are used.
 
     Returns
     =======
     df : DataFrame
+
+    Notes
+    =====
+    The check is decided from the column minima and maxima, so no
+    frame-sized temporaries are allocated when it passes. Missing values
+    are skipped.
     """
-    means = df.mean()
-    stds = df.std()
-    inliers = (np.abs(df[means.index] - means) < n * stds)
-    if not np.all(inliers):
-        msg = generic.bad_locations(~inliers)
+    if means is not None:
+        means = pd.Series(means)
+        columns = means.index
+    elif stds is not None:
+        columns = pd.Series(stds).index
+    else:
+        columns = df.select_dtypes(include=[np.number, 'bool']).columns
+    cache = _cache.current(df)
+    if cache is None:
+        cache = _cache.FrameCache(df)
+    means = cache.reduce('mean', columns) if means is None else means[columns]
+    stds = cache.reduce('std', columns) if stds is None else pd.Series(stds)[columns]
+    bound = n * stds
+    failing = ((cache.reduce('min', columns) <= means - bound) |
+               (cache.reduce('max', columns) >= means + bound))
+    if failing.any():
+        columns = failing.index[failing.values]
+        outliers = pd.DataFrame({col: (df[col] - means[col]).abs() >= bound[col]
+                                 for col in columns}, columns=columns)
+        msg = generic.bad_locations(outliers)
         raise AssertionError(msg)
     return df
 
 
-def has_dtypes(df, items):
+@_background.deferrable
+def has_dtypes(df, items, sample=None, cache=False, seed=None, escalate=False, n_jobs=None):
     """
     Assert that a DataFrame has ``dtypes`` as described in ``items``.
 
@@ -237,6 +465,25 @@ def has_dtypes(df, items):
         np.dtype('int32')``.
       Instead of a mapping, items may also be a single value from above. For example, ``'int32'``
       check that all columns have dtype ``int32``.
+    sample: float, int or None
+      If given, ``infer_dtype`` strings are checked on a random sample of the
+      rows instead of the whole column: a fraction of the rows, or a number of
+      rows. Dtypes themselves are always checked exactly.
+    cache: bool
+      Whether to reuse ``infer_dtype`` results for column buffers that have already
+      been inferred. Results are keyed on the column's underlying array, so a column
+      that is reassigned is inferred again, but values changed in place (e.g. with
+      ``df.loc[i, col] = x``) are not detected. Only enable it for frames that are
+      not modified in place.
+    seed: int or None
+      Seed of the random sample. By default each call draws a new sample;
+      with a fixed seed the sample is reproducible, and can be cached.
+    escalate: bool
+      If the sample infers the wrong dtype, infer it on the whole column
+      before failing.
+    n_jobs: int or None
+      Number of threads checking columns in parallel, -1 for one per CPU.
+      Defaults to ``engarde.options.get_n_jobs()``.
 
     Returns
     =======
@@ -254,22 +501,11 @@ def has_dtypes(df, items):
       df = df.pipe(ck.has_dtypes, items={'A': np.int32,
                                          'B': pd.api.types.is_float_dtype})
     """
-    import types
-    import typing
-    from pandas.api.types import is_dtype_equal, infer_dtype
-
-    if not isinstance(items, typing.Mapping):  # check all columns for items
+    if not isinstance(items, Mapping):  # check all columns for items
         items = {col_name: items for col_name in df.columns}
 
-    infer_strings = {
-                    'string', 'unicode', 'bytes',
-                    'floating', 'integer', 'mixed-integer',
-                    'mixed-integer-float', 'complex,', 'categorical',
-                    'boolean', 'datetime64', 'datetime',
-                    'date', 'timedelta64', 'timedelta',
-                    'time', 'period', 'mixed',
-                    }
-    for k, v in items.items():
+    def check_column(item):
+        k, v = item
         dtype = df.dtypes[k]
         if isinstance(v, (types.FunctionType, types.BuiltinFunctionType)):
             result = v(dtype)
@@ -279,17 +515,27 @@ def has_dtypes(df, items):
             if not result:
                 msg = "Column {!r} has the wrong dtype ({!r}) for function {!r}"
                 raise AssertionError(msg.format(k, dtype, v.__name__))
-        elif v in infer_strings:
-            inferred_dtype_str = infer_dtype(df[k])
+        elif isinstance(v, six.string_types) and v in _INFER_STRINGS:
+            size = None if sample is None else _sampling.sample_size(len(df), sample)
+            inferred_dtype_str = _kernels.infer_dtype(df[k], sample=size, seed=seed,
+                                                      cache=cache)
+            if inferred_dtype_str != v and escalate and size is not None:
+                inferred_dtype_str = _kernels.infer_dtype(df[k], cache=cache)
             if not inferred_dtype_str == v:
                 msg = "Column {!r} expected {!r} for infer_dtype, got {!r}"
-                raise AssertionError(msg.format(k, v, inferred_dtype_str))
+                msg = msg.format(k, v, inferred_dtype_str)
+                if size is not None and size < len(df) and not escalate:
+                    msg += " (in a random sample of {} of {} rows)".format(size, len(df))
+                raise AssertionError(msg)
         elif not is_dtype_equal(dtype, v):
             msg = "Column {!r} is checked for dtype {!r}, had dtype {!r}"
             raise AssertionError(msg.format(k, v, dtype))
+
+    _parallel.map_columns(check_column, items.items(), n_jobs)
     return df
 
 
+@_background.deferrable
 def one_to_many(df, unitcol, manycol):
     """
     Assert that a many-to-one relationship is preserved between two
@@ -311,16 +557,77 @@ def one_to_many(df, unitcol, manycol):
     =======
     df : DataFrame
 
+    Notes
+    =====
+    Runs in a single hash-based pass over the two columns and reports
+    every violating value of ``manycol`` (capped) with its conflicting
+    ``unitcol`` values.
+    """
+    _assert_single_valued(df, manycol, unitcol)
+    return df
+
+
+@_background.deferrable
+def many_to_one(df, manycol, unitcol):
     """
-    subset = df[[manycol, unitcol]].drop_duplicates()
-    for many in subset[manycol].unique():
-        if subset[subset[manycol] == many].shape[0] > 1:
-            msg = "{} in {} has multiple values for {}".format(many, manycol, unitcol)
-            raise AssertionError(msg)
+    Assert that each value in ``manycol`` is associated with a single value
+    in ``unitcol``. This is the same relationship as :func:`one_to_many`,
+    read from the other side.
 
+    Parameters
+    ==========
+    df : DataFrame
+    manycol : str
+        The column whose values must each map to a single ``unitcol`` value.
+    unitcol : str
+        The column that encapulates the groups in ``manycol``.
+
+    Returns
+    =======
+    df : DataFrame
+    """
+    _assert_single_valued(df, manycol, unitcol)
     return df
 
 
+@_background.deferrable
+def one_to_one(df, col1, col2):
+    """
+    Assert that there is a one-to-one relationship between two columns,
+    i.e. each value of ``col1`` is associated with a single value of
+    ``col2`` and vice versa.
+
+    Parameters
+    ==========
+    df : DataFrame
+    col1 : str
+    col2 : str
+
+    Returns
+    =======
+    df : DataFrame
+    """
+    _assert_single_valued(df, col1, col2)
+    _assert_single_valued(df, col2, col1)
+    return df
+
+
+def _assert_single_valued(df, keycol, valuecol):
+    cache = _cache.current(df)
+    if cache is not None:
+        keys, values = cache.factorize(keycol), cache.factorize(valuecol)
+    else:
+        keys, values = pd.factorize(df[keycol]), pd.factorize(df[valuecol])
+    n_bad, conflicts = _kernels.conflicting_keys(keys, values, limit=_MAX_REPORT)
+    if n_bad:
+        lines = ["{!r} in {} has multiple values for {}: {!r}".format(
+                 key, keycol, valuecol, values) for key, values in conflicts]
+        if n_bad > len(conflicts):
+            lines.append("... and {} more".format(n_bad - len(conflicts)))
+        raise AssertionError("\n".join(lines))
+
+
+@_background.deferrable
 def is_same_as(df, df_to_compare, **kwargs):
     """
     Assert that two pandas dataframes are the equal
@@ -336,15 +643,49 @@ def is_same_as(df, df_to_compare, **kwargs):
     =======
     df : DataFrame
 
+    Notes
+    =====
+    Frames with identical labels, dtypes and values pass without calling
+    ``assert_frame_equal``. The values are compared column by column,
+    stopping at the first column that differs, and the detailed
+    comparison is only run when something differs.
     """
+    if _identical(df, df_to_compare):
+        return df
     try:
-        tm.assert_frame_equal(df, df_to_compare, **kwargs)
+        assert_frame_equal(df, df_to_compare, **kwargs)
     except AssertionError as exc:
         six.raise_from(AssertionError("DataFrames are not equal"), exc)
     return df
 
 
-__all__ = ['is_monotonic', 'is_same_as', 'is_shape', 'none_missing',
+def _identical(df, other):
+    """
+    Whether ``df`` and ``other`` are exactly equal, including dtypes, names,
+    index frequencies, category order and flags, i.e. anything
+    ``assert_frame_equal`` may compare.
+    """
+    if not isinstance(other, pd.DataFrame) or df.shape != other.shape:
+        return False
+    if df.flags != other.flags:
+        return False
+    for left, right in [(df.index, other.index), (df.columns, other.columns)]:
+        if (not _kernels.dtypes_identical(left.dtype, right.dtype) or
+                left.names != right.names or
+                getattr(left, 'freq', None) != getattr(right, 'freq', None) or
+                not left.equals(right)):
+            return False
+        if isinstance(left, pd.MultiIndex) and not all(
+                _kernels.dtypes_identical(a.dtype, b.dtype)
+                for a, b in zip(left.levels, right.levels)):
+            return False
+    if df.columns.has_duplicates:
+        return False
+    return all(_kernels.arrays_equal(df[col], other[col]) for col in df.columns)
+
+
+__all__ = ['is_monotonic', 'is_same_as', 'is_shape', 'none_missing', 'all_finite',
            'unique_index', 'within_n_std', 'within_range', 'within_set',
-           'has_dtypes', 'verify_df', 'verify_columns']
+           'has_dtypes', 'one_to_many', 'many_to_one', 'one_to_one',
+           'verify_df', 'verify_columns']
 
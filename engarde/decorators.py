@@ -1,87 +1,198 @@
 # -*- coding: utf-8 -*-
 from __future__ import (unicode_literals, absolute_import, division)
 
+import asyncio
+import inspect
+import weakref
+from collections import namedtuple
 from functools import wraps
 
 import engarde.checks as ck
+from engarde import options, _background
+from engarde.generic import ValueSet, shared_intermediates
 
-def none_missing(columns=None):
-    """Asserts that no missing values (NaN) are found"""
-    def decorate(func):
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            result = func(*args, **kwargs)
-            ck.none_missing(result, columns=columns)
-            return result
-        return wrapper
-    return decorate
+_Check = namedtuple('_Check', ['check', 'args', 'kwargs', 'policy', 'mode'])
+
+# engarde wrapper -> (undecorated function, list of _Check)
+_plans = weakref.WeakKeyDictionary()
+
+
+def _check_result(check, *check_args, policy=None, mode=None, **check_kwargs):
+    """
+    Return a decorator asserting ``check(result, *check_args, **check_kwargs)``
+    on the decorated function's result.
 
+    ``policy`` is an ``engarde.policies.Policy`` deciding which calls are
+    checked; by default every call is. With ``mode='background'`` the
+    result is returned before it is checked, and a failure is raised at the
+    next sync point, e.g. the next call of a decorated function (see
+    ``engarde.wait``).
 
-def is_shape(shape):
+    When stacked on another engarde decorator, the two are merged into a
+    single wrapper that runs all checks in one validation plan, sharing
+    intermediate results (null masks, min/max, hash tables) between them.
+
+    Coroutine functions are awaited, and each frame yielded by an async
+    generator function is checked. In both cases the checks run in the
+    event loop's default executor, so they don't block the loop.
+
+    If engarde is disabled (see ``engarde.options``) when the function is
+    decorated, it is returned unchanged.
+    """
     def decorate(func):
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            result = func(*args, **kwargs)
-            ck.is_shape(result, shape)
-            return result
+        if not options._enabled:
+            return func
+        _background.validate_mode(mode)
+        checks = [_Check(check, check_args, check_kwargs, policy, mode)]
+        plan = _plan_of(func)
+        if plan is not None:
+            inner, inner_checks = plan
+            func, checks = inner, inner_checks + checks
+
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def wrapper(*args, **kwargs):
+                _background.raise_failures()
+                selected = _select(checks, args, kwargs)
+                result = await func(*args, **kwargs)
+                await _run_in_executor(result, selected)
+                return result
+        elif inspect.isasyncgenfunction(func):
+            @wraps(func)
+            async def wrapper(*args, **kwargs):
+                _background.raise_failures()
+                async for result in func(*args, **kwargs):
+                    await _run_in_executor(result, _select(checks, args, kwargs))
+                    yield result
+        else:
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                _background.raise_failures()
+                selected = _select(checks, args, kwargs)
+                result = func(*args, **kwargs)
+                _run(result, selected)
+                return result
+        _plans[wrapper] = (func, checks)
         return wrapper
     return decorate
 
 
-def unique(columns=None):
+def _plan_of(func):
+    try:
+        return _plans.get(func)
+    except TypeError:  # not weak-referenceable, so not an engarde wrapper
+        return None
+
+
+def _select(checks, args, kwargs):
+    """The checks whose policy selects this call, asking each policy once."""
+    if all(entry.policy is None for entry in checks):
+        return checks
+    decisions = {}
+    selected = []
+    for entry in checks:
+        policy = entry.policy
+        if policy is not None:
+            if id(policy) not in decisions:
+                decisions[id(policy)] = policy.should_check(args, kwargs)
+            if not decisions[id(policy)]:
+                continue
+        selected.append(entry)
+    return selected
+
+
+def _defer(result, checks):
+    """Submit the background checks, in the current context, and return the others."""
+    deferred, immediate = [], []
+    for entry in checks:
+        (deferred if _background.in_background(entry.mode) else immediate).append(entry)
+    if deferred:
+        _background.submit(_run_now, result, deferred)
+    return immediate
+
+
+async def _run_in_executor(result, checks):
+    # submitted from the task, so its sync points see the background failures
+    checks = _defer(result, checks)
+    if checks:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, _run_now, result, checks)
+
+
+def _run(result, checks):
+    checks = _defer(result, checks)
+    with _background.synchronous():
+        _run_now(result, checks)
+
+
+def _run_now(result, checks):
+    if not checks:
+        return
+    if len(checks) == 1:
+        check, args, kwargs = checks[0][:3]
+        check(result, *args, **kwargs)
+        return
+    with shared_intermediates(result):
+        for check, args, kwargs, _, _ in checks:
+            check(result, *args, **kwargs)
+
+def none_missing(columns=None, n_jobs=None, policy=None, mode=None):
+    """Asserts that no missing values (NaN) are found"""
+    return _check_result(ck.none_missing, columns=columns, n_jobs=n_jobs, policy=policy,
+                         mode=mode)
+
+
+def all_finite(columns=None, n_jobs=None, policy=None, mode=None):
+    """Asserts that no missing or infinite values are found"""
+    return _check_result(ck.all_finite, columns=columns, n_jobs=n_jobs, policy=policy,
+                         mode=mode)
+
+
+def is_shape(shape, policy=None, mode=None):
+    return _check_result(ck.is_shape, shape, policy=policy, mode=mode)
+
+
+def unique(columns=None, report=False, assume_sorted=False, engine=None,
+           sample=None, seed=None, stratify=None, escalate=False, n_jobs=None,
+           policy=None, mode=None):
     """
     Asserts that columns in the DataFrame only have unique values.
     """
-    def decorate(func):
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            result = func(*args, **kwargs)
-            ck.unique(result, columns=columns)
-            return result
-        return wrapper
-    return decorate
+    return _check_result(ck.unique, columns=columns, report=report,
+                         assume_sorted=assume_sorted, engine=engine, sample=sample,
+                         seed=seed, stratify=stratify, escalate=escalate, n_jobs=n_jobs,
+                         policy=policy, mode=mode)
 
 
-def unique_index():
-    def decorate(func):
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            result = func(*args, **kwargs)
-            ck.unique_index(result)
-            return result
-        return wrapper
-    return decorate
+def unique_index(policy=None, mode=None):
+    return _check_result(ck.unique_index, policy=policy, mode=mode)
 
-def is_monotonic(items=None, increasing=None, strict=False):
-    def decorate(func):
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            result = func(*args, **kwargs)
-            ck.is_monotonic(result, items=items, increasing=increasing,
-                            strict=strict)
-            return result
-        return wrapper
-    return decorate
+def is_monotonic(items=None, increasing=None, strict=False, engine=None, n_jobs=None,
+                 policy=None, mode=None):
+    return _check_result(ck.is_monotonic, items=items, increasing=increasing,
+                         strict=strict, engine=engine, n_jobs=n_jobs, policy=policy,
+                         mode=mode)
 
-def within_set(items):
+def within_set(items, sample=None, seed=None, stratify=None, escalate=False, n_jobs=None,
+               policy=None, mode=None):
     """
     Check that DataFrame values are within set.
 
     >>> @within_set({'A': {1, 3}})
     >>> def f(df):
             return df
+
+    The allowed values are compiled into lookup tables once, when the
+    function is decorated. With ``sample``, only a random sample of the
+    rows is checked, see ``checks.within_set``.
     """
-    def decorate(func):
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            result = func(*args, **kwargs)
-            ck.within_set(result, items)
-            return result
-        return wrapper
-    return decorate
+    items = {k: ValueSet(v) for k, v in items.items()}
+    return _check_result(ck.within_set, items, sample=sample, seed=seed,
+                         stratify=stratify, escalate=escalate, n_jobs=n_jobs, policy=policy,
+                         mode=mode)
 
 
-def within_range(items):
+def within_range(items, engine=None, n_jobs=None, policy=None, mode=None):
     """
     Check that a DataFrame's values are within a range.
 
@@ -92,112 +203,78 @@ def within_range(items):
         array-like checks the same (lower, upper) for each column
 
     """
-    def decorate(func):
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            result = func(*args, **kwargs)
-            ck.within_range(result, items)
-            return result
-        return wrapper
-    return decorate
+    return _check_result(ck.within_range, items, engine=engine, n_jobs=n_jobs, policy=policy,
+                         mode=mode)
 
 
-def within_n_std(n=3):
+def within_n_std(n=3, means=None, stds=None, policy=None, mode=None):
     """
     Tests that all values are within 3 standard deviations
-    of their mean.
+    of their mean, or of the reference ``means`` and ``stds``.
     """
-    def decorate(func):
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            result = func(*args, **kwargs)
-            ck.within_n_std(result, n=n)
-            return result
-        return wrapper
-    return decorate
+    return _check_result(ck.within_n_std, n=n, means=means, stds=stds, policy=policy,
+                         mode=mode)
 
-def has_dtypes(items):
+def has_dtypes(items, sample=None, cache=False, seed=None, escalate=False, n_jobs=None,
+               policy=None, mode=None):
     """
     Tests that the dtypes are as specified in items.
     """
-    def decorate(func):
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            result = func(*args, **kwargs)
-            ck.has_dtypes(result, items)
-            return result
-        return wrapper
-    return decorate
+    return _check_result(ck.has_dtypes, items, sample=sample, cache=cache, seed=seed,
+                         escalate=escalate, n_jobs=n_jobs, policy=policy, mode=mode)
 
 
-def one_to_many(unitcol, manycol):
+def one_to_many(unitcol, manycol, policy=None, mode=None):
     """ Tests that each value in ``manycol`` only is associated with
     just a single value in ``unitcol``.
     """
-    def decorate(func):
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            result = func(*args, **kwargs)
-            ck.one_to_many(result, unitcol, manycol)
-            return result
-        return wrapper
-    return decorate
+    return _check_result(ck.one_to_many, unitcol, manycol, policy=policy, mode=mode)
+
+
+def many_to_one(manycol, unitcol, policy=None, mode=None):
+    """ Tests that each value in ``manycol`` only is associated with
+    just a single value in ``unitcol``.
+    """
+    return _check_result(ck.many_to_one, manycol, unitcol, policy=policy, mode=mode)
 
 
-def verify_df(check, *args, **kwargs):
+def one_to_one(col1, col2, policy=None, mode=None):
+    """ Tests that each value in ``col1`` is associated with a single
+    value in ``col2`` and vice versa.
+    """
+    return _check_result(ck.one_to_one, col1, col2, policy=policy, mode=mode)
+
+
+def verify_df(check, *args, policy=None, mode=None, **kwargs):
     """
     Assert that `check(df, *args, **kwargs)` is true.
     """
-    def decorate(func):
-        @wraps(func)
-        def wrapper(*args_inner, **kwargs_inner):
-            result = func(*args_inner, **kwargs_inner)
-            ck.verify_df(result, check, *args, **kwargs)
-            return result
-        return wrapper
-    return decorate
+    return _check_result(ck.verify_df, check, *args, policy=policy, mode=mode, **kwargs)
 
 
-def verify_columns(items, *args, columns=None, **kwargs):
+def verify_columns(items, *args, columns=None, policy=None, mode=None, **kwargs):
     """
     Assert that for all keys/values of items, `value(df[key], *args, **kwargs)` is true.
     """
-    def decorate(func):
-        @wraps(func)
-        def wrapper(*args_inner, **kwargs_inner):
-            result = func(*args_inner, **kwargs_inner)
-            ck.verify_columns(result, items, *args, columns=columns, **kwargs)
-            return result
-        return wrapper
-    return decorate
+    return _check_result(ck.verify_columns, items, *args, columns=columns, policy=policy,
+                         mode=mode, **kwargs)
 
 
-def verify_rows(items, *args, rows=None, **kwargs):
+def verify_rows(items, *args, rows=None, policy=None, mode=None, **kwargs):
     """
-    Assert ``items`` for for rows in df.
+    Assert ``items`` for for rows in df. ``items`` may also be an
+    expression string, e.g. ``"A > B"``, evaluated with ``DataFrame.eval``.
     """
-    def decorate(func):
-        @wraps(func)
-        def wrapper(*args_inner, **kwargs_inner):
-            result = func(*args_inner, **kwargs_inner)
-            ck.verify_rows(result, items, *args, rows=None, **kwargs)
-            return result
-        return wrapper
-    return decorate
+    return _check_result(ck.verify_rows, items, *args, rows=rows, policy=policy, mode=mode,
+                         **kwargs)
 
 
-def is_same_as(df_to_compare, **assert_kwargs):
-    def decorate(func):
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            result = func(*args, **kwargs)
-            ck.is_same_as(result, df_to_compare, **assert_kwargs)
-            return result
-        return wrapper
-    return decorate
+def is_same_as(df_to_compare, policy=None, mode=None, **assert_kwargs):
+    return _check_result(ck.is_same_as, df_to_compare, policy=policy, mode=mode, **assert_kwargs)
 
 
-__all__ = ['is_monotonic', 'is_same_as', 'is_shape', 'none_missing',
+__all__ = ['is_monotonic', 'is_same_as', 'is_shape', 'none_missing', 'all_finite',
            'unique_index', 'within_range', 'within_set', 'has_dtypes',
+           'one_to_many', 'many_to_one', 'one_to_one',
            'verify_df', 'verify_columns', 'within_n_std']
 
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+Exceptions raised by failing checks.
+"""
+import weakref
+
+# maximum number of offending rows kept in a ValidationError
+_MAX_SAMPLE = 10
+
+
+class ValidationError(AssertionError):
+    """
+    A check failed.
+
+    Only a compact summary of the checked DataFrame is kept, so a stored
+    or logged exception does not keep the frame alive.
+
+    Parameters
+    ==========
+    msg : str
+    df : DataFrame, optional
+        The checked frame. Only its shape, a weak reference and, if
+        ``bad_positions`` is given, a copy of a few offending rows are kept.
+    check : str, optional
+        Name of the failing check.
+    bad_positions : array-like of int, optional
+        Positions in ``df`` of the offending rows, possibly only the first few.
+    n_bad : int, optional
+        Total number of offending rows, if more than ``bad_positions``.
+
+    Attributes
+    ==========
+    check : str or None
+    shape : tuple or None
+    n_bad : int or None
+        Number of offending rows.
+    sample : DataFrame or None
+        Copy of at most 10 offending rows.
+    """
+
+    def __init__(self, msg, df=None, check=None, bad_positions=None, n_bad=None):
+        super(ValidationError, self).__init__(msg)
+        self.check = check
+        self.shape = None if df is None else df.shape
+        if n_bad is None and bad_positions is not None:
+            n_bad = len(bad_positions)
+        self.n_bad = n_bad
+        self.sample = None
+        if df is not None and bad_positions is not None:
+            # by position, so duplicated labels can't select more rows
+            self.sample = df.iloc[list(bad_positions[:_MAX_SAMPLE])].copy()
+        try:
+            self._frame = weakref.ref(df)
+        except TypeError:
+            self._frame = None
+
+    @property
+    def frame(self):
+        """The checked DataFrame if it is still alive, else None."""
+        return None if self._frame is None else self._frame()
+
+    def __reduce__(self):
+        # the weak reference can't be pickled
+        return (_rebuild, (type(self), self.args, self.check, self.shape,
+                           self.n_bad, self.sample))
+
+
+def _rebuild(cls, args, check, shape, n_bad, sample):
+    exc = cls(*args)
+    exc.check, exc.shape, exc.n_bad, exc.sample = check, shape, n_bad, sample
+    return exc
+
+
+__all__ = ['ValidationError']
@@ -2,10 +2,15 @@
 """
 Module for useful generic functions.
 """
-from itertools import chain, cycle
-
 import numpy as np
 import pandas as pd
+from pandas.api.types import is_categorical_dtype
+
+from engarde import options, _cache, _numba, _parallel, _sampling, _trace
+from engarde.exceptions import ValidationError
+
+# maximum number of offending labels shown in an error message
+_MAX_REPORT = 10
 
 
 # --------------
@@ -27,21 +32,51 @@ def verify_df(df, check, *args, **kwargs):
     =======
     df : DataFrame
         same as the input.
+
+    Raises
+    ======
+    ValidationError
+        If the check fails. The exception keeps the frame's shape and a
+        weak reference to it, not the frame itself.
     """
+    if not options._enabled:
+        return df
     result = check(df, *args, **kwargs)
-    try:
-        assert result
-    except AssertionError as e:
+    if not result:
         msg = '{} is not true'.format(check.__name__)
-        e.args = (msg, df)
-        raise
+        raise ValidationError(msg, df, check=check.__name__)
     return df
 
 # -----------------------
 # Generic verify_df_series
 # -----------------------
 
-def verify_df_series(df, func, *args, columns=None, rows=None, axis=0, how='all', **kwargs):
+# NumPy functions and aggregation names that DataFrame implements as
+# reductions over each dtype block, mapped to the DataFrame method name.
+_REDUCTIONS = {
+    np.all: 'all', np.any: 'any',
+    np.sum: 'sum', np.nansum: 'sum',
+    np.prod: 'prod', np.nanprod: 'prod',
+    np.min: 'min', np.amin: 'min', np.nanmin: 'min',
+    np.max: 'max', np.amax: 'max', np.nanmax: 'max',
+    np.mean: 'mean', np.nanmean: 'mean',
+    np.median: 'median', np.nanmedian: 'median',
+}
+_REDUCTION_NAMES = frozenset(_REDUCTIONS.values()) | {'count'}
+
+
+def _reduction_name(func):
+    """Return the DataFrame reduction equivalent to ``func``, or None."""
+    if isinstance(func, str):
+        return func if func in _REDUCTION_NAMES else None
+    try:
+        return _REDUCTIONS.get(func)
+    except TypeError:  # unhashable, e.g. a dict of functions
+        return None
+
+
+def verify_df_series(df, func, *args, columns=None, rows=None, axis=0, how='all',
+                     vectorize=True, engine=None, workers=None, **kwargs):
     """
     Verify that ``df.agg(func, axis, *args, **kwargs)`` are ``True``.
 
@@ -50,7 +85,11 @@ def verify_df_series(df, func, *args, columns=None, rows=None, axis=0, how='all'
     df : DataFrame
     func : callable, string or dictionary of callables.
         Callables should take df, *args, and **kwargs as arguments and
-        return a bool.
+        return a bool. NumPy reductions such as ``np.all`` or ``np.amin``
+        and aggregation names such as ``'all'`` are evaluated as DataFrame
+        reductions over each dtype block instead of once per column; with
+        ``columns`` (and no ``rows``), as reductions of each selected column,
+        so the columns are not copied out of ``df``.
     columns: str, list, slice object etc.
         Same as allowed for df.loc
     rows : str, list, slice object etc.
@@ -60,16 +99,69 @@ def verify_df_series(df, func, *args, columns=None, rows=None, axis=0, how='all'
     how: str
         ``'all'`` means the check is only passed if all column checks evaluate to True.
         ``'any'`` means the check is passed if any column check evaluates to True.
+    vectorize : bool
+        For ``axis=1``, first try to vectorize a callable by tracing it on a
+        symbolic row, so simple predicates like ``lambda row: row.A > row.B``
+        run on whole columns. Predicates that cannot be traced (truth tests,
+        method calls, ...) are evaluated row by row. Traced predicates are
+        called once with a symbolic row, so they should not have side effects.
+    engine : None or 'numba'
+        With ``'numba'``, ``func`` is compiled with ``numba.njit`` and called
+        in compiled code: once per column with the column's ndarray for
+        ``axis=0``, once per row with a namedtuple of the row's non-object
+        values for ``axis=1``. Compiled functions are cached per ``func``.
+    workers : int or None
+        For ``axis=1``, run a callable that cannot be vectorized on a pool of
+        ``workers`` processes, each checking a range of rows. Numeric columns
+        are shared with the workers through shared memory.
 
     Returns
     =======
     df : DataFrame
         same as the input.
     """
-    rows, columns = rows or slice(None), columns or slice(None)
-    check_df = df.loc[rows, columns]
+    if not options._enabled:
+        return df
+    use_numba = _numba.validate_engine(engine)
+    reduction = None if args or kwargs else _reduction_name(func)
+    if rows is None and columns is None:
+        check_df = df
+    elif (reduction is not None and not use_numba and axis == 0 and rows is None
+            and not isinstance(columns, str)):
+        check_df = None  # reduced column by column, without copying the columns
+    else:
+        check_df = df.loc[slice(None) if rows is None else rows,
+                          slice(None) if columns is None else columns]
 
-    result_df = check_df.agg(func, axis, *args, **kwargs)
+    result_df = None
+    if check_df is None:
+        result_df = _reduce_columns(df, columns, reduction)
+    elif use_numba:
+        if not callable(func):
+            raise TypeError("engine='numba' requires a callable, got {!r}".format(func))
+        if kwargs:
+            raise TypeError("engine='numba' does not support keyword arguments")
+        if axis == 0:
+            result_df = pd.Series(_numba.evaluate_columns(check_df, func, *args),
+                                  index=check_df.columns)
+        else:
+            result_df = pd.Series(_numba.evaluate_rows(check_df, func, *args),
+                                  index=check_df.index)
+    elif reduction is not None:
+        result_df = getattr(check_df, reduction)(axis=axis)
+    elif axis == 1 and callable(func):
+        if vectorize:
+            try:
+                result = _trace.evaluate_rows(check_df, func, *args, **kwargs)
+            except _trace.Untraceable:
+                pass
+            else:
+                result_df = pd.Series(result, index=check_df.index)
+        if result_df is None and workers is not None and workers > 1:
+            result = _parallel.evaluate_rows(check_df, func, workers, *args, **kwargs)
+            result_df = pd.Series(result, index=check_df.index)
+    if result_df is None:
+        result_df = check_df.agg(func, axis, *args, **kwargs)
     if how == 'all':
         result = result_df.all()
     elif how == 'any':
@@ -78,17 +170,41 @@ def verify_df_series(df, func, *args, columns=None, rows=None, axis=0, how='all'
         msg = "Parameter 'how' must be either 'all' or 'any', was {!r}"
         raise ValueError(msg.format(how))
 
-    if axis == 0:
-        msg = "These columns don't pass the validation: {!r}"
-    else:
-        msg = "These rows don't pass the validation: {!r}"
-    not_passed_cols = result_df[result_df == False].index.tolist()
-    assert result, msg.format(not_passed_cols)
-
+    if not result:
+        positions = np.flatnonzero(np.asarray(result_df == False))
+        not_passed = _capped(result_df.index[positions[:_MAX_REPORT]].tolist(), len(positions))
+        name = getattr(func, '__name__', repr(func))
+        if axis == 0:
+            msg = "These columns don't pass the validation: {}"
+            raise ValidationError(msg.format(not_passed), df, check=name)
+        msg = "These rows don't pass the validation: {}"
+        raise ValidationError(msg.format(not_passed), df, check=name,
+                              bad_positions=_positions_in(df, rows, positions[:_MAX_REPORT]),
+                              n_bad=len(positions))
     return df
 
 
-def verify_columns(df, func, *args, columns=None, how='all', **kwargs):
+def _reduce_columns(df, columns, reduction):
+    """``getattr(df.loc[:, columns], reduction)()``, reducing each column of ``df`` in place."""
+    labels = pd.Series(df.columns, index=df.columns).loc[columns].index
+    return pd.Series([getattr(df[col], reduction)() for col in labels], index=labels)
+
+
+def _capped(labels, n):
+    """``repr(labels)``, followed by the number of omitted labels out of ``n``."""
+    if n > len(labels):
+        return "{!r} and {} more".format(labels, n - len(labels))
+    return repr(labels)
+
+
+def _positions_in(df, rows, positions):
+    """Positions in ``df`` of the rows at ``positions`` in ``df.loc[rows]``."""
+    if rows is None:
+        return positions
+    return pd.Series(np.arange(len(df)), index=df.index).loc[rows].values[positions]
+
+
+def verify_columns(df, func, *args, columns=None, how='all', engine=None, **kwargs):
     """
     Verify that ``func`` validates for each column in df.
 
@@ -103,16 +219,22 @@ def verify_columns(df, func, *args, columns=None, how='all', **kwargs):
     how: str
         ``'all'`` means the check is only passed if all column checks evaluate to True.
         ``'any'`` means the check is passed if any column check evaluates to True.
+    engine : None or 'numba'
+        Compile ``func`` with numba and call it on each column's ndarray,
+        see ``verify_df_series``.
 
     Returns
     =======
     df : DataFrame
         same as the input.
     """
-    return verify_df_series(df, func, *args, columns=columns, axis=0, how=how, **kwargs)
+    return verify_df_series(df, func, *args, columns=columns, axis=0, how=how,
+                            engine=engine, **kwargs)
 
 
-def verify_rows(df, func, *args, rows=None, how='all', **kwargs):
+def verify_rows(df, func, *args, rows=None, how='all', chunksize=None, vectorize=True,
+                engine=None, workers=None, sample=None, seed=None, stratify=None,
+                escalate=False, **kwargs):
     """
     Verify that ``func`` validates for rows in df.
 
@@ -121,31 +243,305 @@ def verify_rows(df, func, *args, rows=None, how='all', **kwargs):
     df : DataFrame
     func : callable, string or dictionary of callables.
         Callables should take df, *args, and **kwargs as arguments and
-        return a bool.
+        return a bool. A string that is not a DataFrame method name (such as
+        ``'all'`` or ``'nunique'``) is an expression evaluated column-wise
+        with ``DataFrame.eval``, e.g.
+        ``"A > B and C.notna()"``; **kwargs are then passed to ``eval``,
+        except ``engine``, which selects the engine of callables (call
+        ``verify_expression(df, expr, engine='python')`` to choose eval's).
+        ``vectorize`` and ``workers`` do not apply to expressions.
     rows : str, list, slice object etc.
         Same as allowed for df.loc
     how: str
         ``'all'`` means the check is only passed if all column checks evaluate to True.
         ``'any'`` means the check is passed if any column check evaluates to True.
+    chunksize : int or None
+        For expressions, evaluate ``chunksize`` rows at a time to bound the
+        memory used by temporaries.
+    vectorize : bool
+        Whether to try to vectorize a callable ``func`` by tracing it, see
+        ``verify_df_series``.
+    engine : None or 'numba'
+        Compile ``func`` with numba and call it on a namedtuple of each
+        row's values, see ``verify_df_series``.
+    workers : int or None
+        Evaluate a callable that cannot be vectorized on this many
+        processes, see ``verify_df_series``.
+    sample : float, int or None
+        Only verify a random sample of the selected rows: a fraction of the
+        rows, or a number of rows. On success, an upper confidence bound on
+        the fraction of failing rows is logged to the ``engarde`` logger.
+    seed : int or None
+        Seed of the random sample.
+    stratify : str or None
+        Column to sample each distinct value of in proportion to its
+        frequency, with at least one row per value.
+    escalate : bool
+        If the sample fails, verify all rows to report every violation.
+
+    Returns
+    =======
+    df : DataFrame
+        same as the input.
+    """
+    if sample is not None and options._enabled:
+        selected = df if rows is None else df.loc[rows]
+        _sampling.run(verify_rows, selected, sample, seed, stratify, escalate, func, *args,
+                      how=how, chunksize=chunksize, vectorize=vectorize, engine=engine,
+                      workers=workers, **kwargs)
+        return df
+    if isinstance(func, str) and not hasattr(pd.DataFrame, func):
+        if args:
+            raise TypeError("Positional arguments are not supported for expressions, "
+                            "pass variables with local_dict instead")
+        if engine is not None or workers is not None:
+            raise TypeError("Parameters 'engine' and 'workers' apply to callables, not to "
+                            "expressions; use verify_expression to pass eval's engine")
+        return verify_expression(df, func, rows=rows, how=how, chunksize=chunksize, **kwargs)
+    return verify_df_series(df, func, *args, rows=rows, axis=1, how=how,
+                            vectorize=vectorize, engine=engine, workers=workers,
+                            **kwargs)
+
+
+def verify_expression(df, expr, rows=None, how='all', chunksize=None, **kwargs):
+    """
+    Verify that the boolean expression ``expr`` is true for rows in df.
+
+    The expression is evaluated on whole columns with ``DataFrame.eval``,
+    which uses numexpr when it is installed.
+
+    Parameters
+    ==========
+    df : DataFrame
+    expr : str
+        Expression in the syntax of ``DataFrame.eval``, e.g. ``"A > B"``.
+    rows : str, list, slice object etc.
+        Same as allowed for df.loc
+    how: str
+        ``'all'`` means the check is only passed if the expression is True for all rows.
+        ``'any'`` means the check is passed if the expression is True for any row.
+    chunksize : int or None
+        Evaluate ``chunksize`` rows at a time to bound the memory used by
+        temporaries. None evaluates all rows at once.
+    **kwargs
+        Passed to ``DataFrame.eval``, e.g. ``engine='python'`` to evaluate
+        without numexpr.
 
     Returns
     =======
     df : DataFrame
         same as the input.
     """
-    return verify_df_series(df, func, *args, rows=rows, axis=1, how=how, **kwargs)
+    if not options._enabled:
+        return df
+    if how not in ('all', 'any'):
+        msg = "Parameter 'how' must be either 'all' or 'any', was {!r}"
+        raise ValueError(msg.format(how))
+    check_df = df if rows is None else df.loc[rows]
+    n = len(check_df)
+    step = n if not chunksize else chunksize
+
+    n_failed, failed = 0, np.empty(0, dtype=np.intp)
+    for start in range(0, max(n, 1), max(step, 1)):
+        chunk = check_df.iloc[start:start + step]
+        result = np.broadcast_to(np.asarray(chunk.eval(expr, **kwargs), dtype=bool),
+                                 (len(chunk),))
+        if how == 'any':
+            if result.any():
+                return df
+            continue
+        positions = np.flatnonzero(~result)
+        n_failed += len(positions)
+        if len(failed) < _MAX_REPORT:
+            failed = np.append(failed, start + positions[:_MAX_REPORT - len(failed)])
+
+    if how == 'any':
+        raise ValidationError("No rows pass the validation: {!r}".format(expr), df, check=expr)
+    if n_failed:
+        msg = "{} rows don't pass the validation {!r}, first: {!r}"
+        raise ValidationError(msg.format(n_failed, expr, check_df.index[failed].tolist()),
+                              df, check=expr, bad_positions=_positions_in(df, rows, failed),
+                              n_bad=n_failed)
+    return df
+
+
+def shared_intermediates(df):
+    """
+    Context manager sharing intermediate results between checks on ``df``.
+
+    Inside the block, checks on ``df`` compute each column's null mask,
+    reductions (min, max, mean, std) and factorization (the hash table
+    used by ``unique``, ``within_set`` and ``one_to_many``) at most once.
+    The stacked decorators in ``engarde.decorators`` use this
+    automatically.
+
+    Examples
+    ========
+
+    .. code:: python
+
+      with shared_intermediates(df):
+          ck.none_missing(df)
+          ck.within_range(df, {'A': (0, 10)})
+          ck.within_n_std(df)
+          ck.unique(df, ['A'])
+    """
+    return _cache.activate(df)
+
+
+# ----------------
+# Precompiled sets
+# ----------------
+
+class ValueSet(object):
+    """
+    A set of allowed values, precompiled for fast membership tests.
+
+    The lookup structure is built once and reused by every call to
+    ``contains``: numeric values are kept as a sorted array searched with
+    ``np.searchsorted``, other values in a hashed ``pd.Index`` whose hash
+    table is cached after the first lookup. Categorical columns are tested
+    on their categories only and the result is broadcast via their codes.
+
+    Parameters
+    ==========
+    values : array-like or ValueSet
+        The allowed values.
+    """
+
+    def __init__(self, values):
+        if isinstance(values, ValueSet):
+            values = values.values
+        elif isinstance(values, (set, frozenset, dict)):
+            values = list(values)
+        self.values = pd.Index(values).unique()
+        self.has_nan = bool(self.values.hasnans)
+        if self.values.dtype.kind in 'iufb':
+            sorted_values = np.sort(np.asarray(self.values))
+            if self.has_nan:
+                sorted_values = sorted_values[~np.isnan(sorted_values)]
+            self._sorted = sorted_values
+        else:
+            self._sorted = None
+
+    def __len__(self):
+        return len(self.values)
+
+    def __repr__(self):
+        return 'ValueSet({!r})'.format(self.values.tolist())
+
+    def contains(self, values):
+        """
+        Return a boolean ndarray that is True where ``values`` is in the set.
+
+        Parameters
+        ==========
+        values : Series, Index or array-like
+
+        Returns
+        =======
+        ndarray of bool
+        """
+        if isinstance(values, (pd.Series, pd.Index)):
+            values = values.array
+        if is_categorical_dtype(values):
+            categorical = values if isinstance(values, pd.Categorical) else pd.Categorical(values)
+            found = self.contains(categorical.categories)
+            codes = categorical.codes
+            return np.append(found, self.has_nan)[codes]  # code -1 is missing
+
+        arr = np.asarray(values)
+        if self._sorted is not None and arr.dtype.kind in 'iufb':
+            if not len(self._sorted):
+                found = np.zeros(len(arr), dtype=bool)
+            else:
+                pos = np.searchsorted(self._sorted, arr)
+                np.clip(pos, 0, len(self._sorted) - 1, out=pos)
+                found = self._sorted[pos] == arr
+            if self.has_nan and arr.dtype.kind == 'f':
+                found |= np.isnan(arr)
+            return found
+        return self.values.get_indexer(values) != -1
 
 
 # ---------------
 # Error reporting
 # ---------------
 
-def bad_locations(df):
-    columns = df.columns
-    all_locs = chain.from_iterable(zip(df.index, cycle([col])) for col in columns)
-    bad = pd.Series(list(all_locs))[np.asarray(df).ravel(1)]
-    msg = bad.values
-    return msg
+class BadLocations(object):
+    """
+    Lazy report of the failing cells of a boolean mask.
+
+    Only the integer row and column positions of the failing cells are
+    stored. They are translated to ``(row label, column label)`` tuples
+    when the report is iterated or printed, and printing is capped to the
+    first ``limit`` locations.
+
+    Parameters
+    ==========
+    rows : ndarray of int
+        Row positions of the failing cells.
+    cols : ndarray of int
+        Column positions of the failing cells.
+    index : Index
+        Row labels of the checked DataFrame.
+    columns : Index
+        Column labels of the checked DataFrame.
+    limit : int
+        Maximum number of locations shown by ``repr`` and ``str``.
+    """
+
+    def __init__(self, rows, cols, index, columns, limit=_MAX_REPORT):
+        self.rows = rows
+        self.cols = cols
+        self.index = index
+        self.columns = columns
+        self.limit = limit
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __iter__(self):
+        for row, col in zip(self.rows, self.cols):
+            yield self.index[row], self.columns[col]
+
+    def labels(self, n=None):
+        """Return the first ``n`` (all if None) locations as label tuples."""
+        rows, cols = self.rows[:n], self.cols[:n]
+        return list(zip(self.index[rows], self.columns[cols]))
+
+    def __repr__(self):
+        locs = self.labels(self.limit)
+        more = len(self) - len(locs)
+        msg = '{} bad location(s): {!r}'.format(len(self), locs)
+        if more > 0:
+            msg += ' and {} more'.format(more)
+        return msg
+
+    __str__ = __repr__
+
+
+def bad_locations(df, limit=_MAX_REPORT):
+    """
+    Return the locations of the ``True`` cells of a boolean DataFrame.
+
+    Parameters
+    ==========
+    df : DataFrame
+        Boolean mask, ``True`` where a cell fails a check.
+    limit : int
+        Maximum number of locations shown when the report is printed.
+
+    Returns
+    =======
+    BadLocations
+        Locations ordered column by column, as ``(row, column)`` labels.
+    """
+    cols, rows = np.nonzero(np.asarray(df, dtype=bool).T)
+    return BadLocations(rows, cols, df.index, df.columns, limit=limit)
+
 
-__all__ = ['verify_df', 'verify_df_series', 'verify_columns', 'verify_rows', 'bad_locations']
+__all__ = ['verify_df', 'verify_df_series', 'verify_columns', 'verify_rows',
+           'verify_expression', 'shared_intermediates', 'bad_locations',
+           'BadLocations', 'ValueSet']
 
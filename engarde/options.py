@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+Process-wide options: a switch to turn engarde off, and the default
+number of threads checks spread their columns over.
+
+When engarde is disabled, the decorators in ``engarde.decorators`` return
+the decorated function unchanged (so a disabled decorator costs nothing
+at call time), and the functions in ``engarde.checks`` return their input
+immediately.
+
+Set the environment variable ``ENGARDE_DISABLE=1`` to start disabled, or
+use the functions below::
+
+    import engarde
+
+    with engarde.disabled():
+        @dc.none_missing()
+        def f(df):       # f is not wrapped
+            ...
+
+The default ``n_jobs`` of the checks is read from ``ENGARDE_N_JOBS`` and
+can be changed with ``set_n_jobs``.
+"""
+import os
+
+_enabled = os.environ.get('ENGARDE_DISABLE', '').strip().lower() not in ('1', 'true', 'yes')
+
+_n_jobs = int(os.environ.get('ENGARDE_N_JOBS', '').strip() or 1)
+
+
+def is_enabled():
+    """Whether checks are currently run."""
+    return _enabled
+
+
+def enable():
+    """Run checks, and wrap functions in the decorators."""
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    """Skip checks, and return decorated functions unwrapped."""
+    global _enabled
+    _enabled = False
+
+
+class _Switch(object):
+    def __init__(self, enabled):
+        self.enabled = enabled
+        self._previous = []
+
+    def __enter__(self):
+        global _enabled
+        self._previous.append(_enabled)
+        _enabled = self.enabled
+        return self
+
+    def __exit__(self, *exc_info):
+        global _enabled
+        _enabled = self._previous.pop()
+
+
+def disabled():
+    """Context manager disabling engarde inside the block."""
+    return _Switch(False)
+
+
+def enabled():
+    """Context manager enabling engarde inside the block."""
+    return _Switch(True)
+
+
+def get_n_jobs():
+    """Default number of threads used by checks called without ``n_jobs``."""
+    return _n_jobs
+
+
+def set_n_jobs(n_jobs):
+    """
+    Set the default number of threads used by checks called without
+    ``n_jobs``. 1 checks columns serially, -1 uses one thread per CPU.
+    """
+    global _n_jobs
+    if n_jobs == 0 or n_jobs < -1:
+        raise ValueError("n_jobs must be a positive number or -1, was {!r}".format(n_jobs))
+    _n_jobs = n_jobs
+
+
+__all__ = ['is_enabled', 'enable', 'disable', 'disabled', 'enabled',
+           'get_n_jobs', 'set_n_jobs']
@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+"""
+Policies deciding which calls of a decorated function are checked.
+
+Pass a policy to any decorator in ``engarde.decorators``::
+
+    every_100th = policies.Every(100)
+
+    @dc.none_missing(policy=every_100th)
+    def make_features(df):
+        ...
+
+    every_100th.calls, every_100th.checked, every_100th.skipped
+
+A policy counts the calls it was asked about, and how many of them were
+checked. One policy instance may be shared by several decorators (e.g.
+stacked ones); it is then consulted once per call of each decorated
+function, and its decision applies to all checks using it.
+"""
+import threading
+import time
+
+import pandas as pd
+
+
+class Policy(object):
+    """
+    Base class of the policies. Subclasses implement ``_decide``.
+
+    Attributes
+    ==========
+    calls : int
+        Number of calls seen.
+    checked : int
+        Number of calls whose results were checked.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.checked = 0
+
+    @property
+    def skipped(self):
+        """Number of calls whose results were not checked."""
+        return self.calls - self.checked
+
+    def should_check(self, args, kwargs):
+        """Whether to check the result of a call with ``args`` and ``kwargs``."""
+        with self._lock:
+            self.calls += 1
+            check = self._decide(args, kwargs)
+            if check:
+                self.checked += 1
+            return check
+
+    def _decide(self, args, kwargs):
+        raise NotImplementedError
+
+    def reset(self):
+        """Reset the counters, and any state deciding the next check."""
+        with self._lock:
+            self.calls = 0
+            self.checked = 0
+
+    def __repr__(self):
+        return '{}(calls={}, checked={}, skipped={})'.format(
+            type(self).__name__, self.calls, self.checked, self.skipped)
+
+
+class Always(Policy):
+    """Check every call."""
+
+    def _decide(self, args, kwargs):
+        return True
+
+
+class Every(Policy):
+    """
+    Check every ``n``-th call, starting with the first.
+
+    Parameters
+    ==========
+    n : int
+    """
+
+    def __init__(self, n):
+        if n < 1:
+            raise ValueError("Parameter 'n' must be at least 1, was {!r}".format(n))
+        super(Every, self).__init__()
+        self.n = n
+
+    def _decide(self, args, kwargs):
+        return (self.calls - 1) % self.n == 0
+
+
+class Interval(Policy):
+    """
+    Check at most one call per ``seconds``, starting with the first.
+
+    Parameters
+    ==========
+    seconds : float
+    """
+
+    def __init__(self, seconds):
+        super(Interval, self).__init__()
+        self.seconds = seconds
+        self._last = None
+
+    def _decide(self, args, kwargs):
+        now = time.monotonic()
+        if self._last is not None and now - self._last < self.seconds:
+            return False
+        self._last = now
+        return True
+
+    def reset(self):
+        super(Interval, self).reset()
+        self._last = None
+
+
+class PerSignature(Policy):
+    """
+    Check the first call for each distinct signature of the arguments.
+
+    The signature of a DataFrame argument is its column labels and dtypes,
+    of a Series its name and dtype, and of other arguments their type.
+
+    Parameters
+    ==========
+    rows : bool
+        Whether the number of rows of frames is part of the signature.
+    """
+
+    def __init__(self, rows=False):
+        super(PerSignature, self).__init__()
+        self.rows = rows
+        self._seen = set()
+
+    def signature(self, args, kwargs):
+        """Hashable signature of a call's arguments."""
+        return (tuple(self._describe(arg) for arg in args),
+                tuple(sorted((k, self._describe(v)) for k, v in kwargs.items())))
+
+    def _describe(self, arg):
+        if isinstance(arg, pd.DataFrame):
+            return ('DataFrame', tuple(arg.columns), tuple(map(str, arg.dtypes)),
+                    len(arg) if self.rows else None)
+        if isinstance(arg, pd.Series):
+            return ('Series', arg.name, str(arg.dtype), len(arg) if self.rows else None)
+        return type(arg).__name__
+
+    def _decide(self, args, kwargs):
+        try:
+            signature = self.signature(args, kwargs)
+            if signature in self._seen:
+                return False
+            self._seen.add(signature)
+        except TypeError:  # unhashable column labels
+            pass
+        return True
+
+    def reset(self):
+        super(PerSignature, self).reset()
+        self._seen = set()
+
+
+__all__ = ['Policy', 'Always', 'Every', 'Interval', 'PerSignature']
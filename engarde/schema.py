@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+"""
+Declarative schemas, compiled once into a validation plan.
+
+A ``Schema`` gathers the constraints on a frame's columns and on the frame
+as a whole::
+
+    schema = engarde.Schema({
+        'id': Column('int64', unique=True),
+        'price': Column('float64', within_range=(0, 1e6), finite=True),
+        'state': Column(within_set=['CA', 'NY'], nullable=False),
+    }, unique_index=True)
+
+    df = schema.validate(df)    # or df.pipe(schema)
+
+The constraints are compiled into a plan when the schema is created: one
+call per kind of check covering all the columns it applies to, cheap
+metadata checks first, allowed values precompiled into ``ValueSet``s, and
+scans that another constraint makes redundant dropped. The plan runs with
+shared intermediates (see ``generic.shared_intermediates``).
+
+Schemas are picklable, including their compiled plan, as long as the
+extra ``checks`` are module-level functions.
+"""
+import numpy as np
+
+import engarde.checks as ck
+from engarde import options
+from engarde.generic import ValueSet, shared_intermediates
+
+
+class Column(object):
+    """
+    Constraints on a single column.
+
+    Parameters
+    ==========
+    dtype : dtype, str, function or None
+        Anything ``checks.has_dtypes`` accepts for a column.
+    nullable : bool
+        Whether missing values are allowed.
+    unique : bool
+        Whether the values must be unique.
+    within_range : tuple or None
+        (low, high) bounds of the values.
+    within_set : array-like or None
+        The allowed values.
+    monotonic : None, bool or str
+        True for monotonic in either direction, or ``'increasing'`` or
+        ``'decreasing'``.
+    strict : bool
+        Whether ``monotonic`` is strict.
+    finite : bool
+        Whether missing and infinite values are disallowed.
+    """
+
+    def __init__(self, dtype=None, nullable=True, unique=False, within_range=None,
+                 within_set=None, monotonic=None, strict=False, finite=False):
+        if monotonic not in (None, False, True, 'increasing', 'decreasing'):
+            msg = "Parameter 'monotonic' must be a bool, 'increasing' or 'decreasing', was {!r}"
+            raise ValueError(msg.format(monotonic))
+        self.dtype = dtype
+        self.nullable = nullable
+        self.unique = unique
+        self.within_range = within_range
+        self.within_set = None if within_set is None else ValueSet(within_set)
+        self.monotonic = monotonic
+        self.strict = strict
+        self.finite = finite
+
+    def __repr__(self):
+        defaults = Column()
+        args = ['{}={!r}'.format(name, value) for name, value in vars(self).items()
+                if value is not getattr(defaults, name) and value != getattr(defaults, name)]
+        return 'Column({})'.format(', '.join(args))
+
+
+def _cannot_hold_nulls(dtype):
+    try:
+        return np.dtype(dtype).kind in 'biu'
+    except TypeError:  # not a dtype, e.g. an infer_dtype string or a function
+        return False
+
+
+class Schema(object):
+    """
+    Column and frame constraints, validated with a precompiled plan.
+
+    Parameters
+    ==========
+    columns : dict
+        mapping column names to ``Column``s.
+    shape : tuple or None
+        Expected (n_rows, n_columns), see ``checks.is_shape``.
+    unique_index : bool
+        Whether the index must be unique.
+    strict : bool
+        Whether columns that are not in ``columns`` are an error.
+    checks : list
+        Further frame-level checks, each a function ``check(df)`` or a
+        ``(check, args, kwargs)`` tuple, run after the column checks.
+        E.g. ``[(ck.one_to_many, ('dept', 'employee'), {})]``.
+
+    Attributes
+    ==========
+    plan : list of (check, args, kwargs) tuples
+        The compiled checks, in the order they are run.
+    """
+
+    def __init__(self, columns=None, shape=None, unique_index=False, strict=False,
+                 checks=()):
+        self.columns = dict(columns or {})
+        self.shape = shape
+        self.unique_index = unique_index
+        self.strict = strict
+        self.checks = [(check, (), {}) if callable(check) else tuple(check)
+                       for check in checks]
+        self.plan = self._compile()
+
+    def _compile(self):
+        columns = self.columns
+        plan = []
+
+        def add(check, *args, **kwargs):
+            plan.append((check, args, kwargs))
+
+        # metadata only, no pass over the values
+        if self.shape is not None:
+            add(ck.is_shape, self.shape)
+        dtypes = {k: c.dtype for k, c in columns.items() if c.dtype is not None}
+        if dtypes:
+            add(ck.has_dtypes, dtypes)
+        if self.unique_index:
+            add(ck.unique_index)
+
+        # one scan per column and kind of check. Missing values are found by
+        # the finiteness check, and can't be held by (checked) integer and
+        # boolean columns; strictly monotonic columns are unique.
+        finite = [k for k, c in columns.items() if c.finite]
+        not_null = [k for k, c in columns.items()
+                    if not c.nullable and not c.finite and not _cannot_hold_nulls(c.dtype)]
+        if not_null:
+            add(ck.none_missing, columns=not_null)
+        if finite:
+            add(ck.all_finite, columns=finite)
+        ranges = {k: c.within_range for k, c in columns.items() if c.within_range is not None}
+        if ranges:
+            add(ck.within_range, ranges)
+        sets = {k: c.within_set for k, c in columns.items() if c.within_set is not None}
+        if sets:
+            add(ck.within_set, sets)
+        direction = {True: None, 'increasing': True, 'decreasing': False}
+        monotonic = {k: (direction[c.monotonic], c.strict) for k, c in columns.items()
+                     if c.monotonic}
+        if monotonic:
+            add(ck.is_monotonic, monotonic)
+        unique = [k for k, c in columns.items()
+                  if c.unique and not (c.monotonic and c.strict)]
+        if unique:
+            add(ck.unique, columns=unique)
+
+        plan.extend(self.checks)
+        return plan
+
+    def validate(self, df, n_jobs=None):
+        """
+        Assert that ``df`` satisfies the schema.
+
+        Parameters
+        ==========
+        df : DataFrame
+        n_jobs : int or None
+            Number of threads the column checks use, see ``checks.unique``.
+
+        Returns
+        =======
+        df : DataFrame
+            same as the input.
+        """
+        if not options._enabled:
+            return df
+        missing = [k for k in self.columns if k not in df.columns]
+        if missing:
+            raise AssertionError("Missing columns: {!r}".format(missing))
+        if self.strict:
+            extra = [k for k in df.columns if k not in self.columns]
+            if extra:
+                raise AssertionError("Unexpected columns: {!r}".format(extra))
+        with shared_intermediates(df):
+            for check, args, kwargs in self.plan:
+                if n_jobs is not None and check in _PARALLEL:
+                    kwargs = dict(kwargs, n_jobs=n_jobs)
+                check(df, *args, **kwargs)
+        return df
+
+    __call__ = validate
+
+    def __repr__(self):
+        return 'Schema(columns={!r}, checks={})'.format(list(self.columns), len(self.plan))
+
+
+# checks taking ``n_jobs``
+_PARALLEL = frozenset([ck.none_missing, ck.all_finite, ck.within_range, ck.within_set,
+                       ck.is_monotonic, ck.unique, ck.has_dtypes])
+
+
+__all__ = ['Column', 'Schema']
@@ -40,6 +40,7 @@ setup(
     # $ pip install -e .[dev,test]
     extras_require={
         'dev': [''],
+        'numba': ['numba'],
         'test': ['coverage', 'pytest', 'ipython', 'traitlets', 'numpydoc'],
     },
 
@@ -4,8 +4,11 @@ import numpy as np
 import pandas as pd
 import pandas.util.testing as tm
 
+import engarde
 import engarde.checks as ck
 import engarde.decorators as dc
+import engarde.generic as generic
+from engarde.exceptions import ValidationError
 
 
 def _add_n(df, n=1):
@@ -33,6 +36,18 @@ def test_none_missing_raises():
     with pytest.raises(AssertionError):
         dc.none_missing()(_add_n)(df, n=2)
 
+def test_none_missing_report():
+    df = pd.DataFrame({'A': [1.0, np.nan, 3.0, np.nan], 'B': [1.0, 2.0, 3.0, 4.0]},
+                      index=list('abcd'))
+    with pytest.raises(AssertionError) as exc:
+        ck.none_missing(df)
+    msg = str(exc.value)
+    assert "'A' has 2 missing value(s)" in msg
+    assert "['b', 'd']" in msg
+    assert "'B'" not in msg
+
+    tm.assert_frame_equal(df, ck.none_missing(df, columns=['B']))
+
 def test_monotonic_increasing_lax():
     df = pd.DataFrame([1, 2, 2])
     tm.assert_frame_equal(df, ck.is_monotonic(df, increasing=True))
@@ -136,6 +151,241 @@ def test_monotonic_items():
     tm.assert_frame_equal(dc.is_monotonic(items={'A': (True, True)}, strict=True)(_add_n)(
         df), df + 1)
 
+def test_monotonic_report():
+    df = pd.DataFrame({'A': [1, 2, 3, 2, 5]}, index=list('abcde'))
+    with pytest.raises(AssertionError, match="'A' is not increasing, first violation at row 'd'"):
+        ck.is_monotonic(df, increasing=True)
+    with pytest.raises(AssertionError, match="row 'd'"):
+        ck.is_monotonic(df)
+    # a leading missing value is the first violation
+    df = pd.DataFrame({'A': [np.nan, 1.0, 2.0]})
+    with pytest.raises(AssertionError, match="row 0"):
+        ck.is_monotonic(df)
+    with pytest.raises(AssertionError, match="row 0"):
+        ck.is_monotonic(df, increasing=True)
+
+def test_monotonic_dtypes():
+    dates = pd.date_range('2017-01-01', periods=5)
+    df = pd.DataFrame({'A': dates, 'B': dates[::-1], 'C': list('abcde'),
+                       'D': pd.Categorical(list('aabbc'))})
+    tm.assert_frame_equal(df, ck.is_monotonic(df))
+    tm.assert_frame_equal(df, ck.is_monotonic(df, items={'A': (True, True),
+                                                         'B': (False, True)}))
+
+    with pytest.raises(AssertionError):
+        ck.is_monotonic(df, items={'D': (None, True)})
+    with pytest.raises(AssertionError):
+        ck.is_monotonic(df.assign(A=dates.insert(2, pd.NaT)[:5]))
+    with pytest.raises(AssertionError):
+        ck.is_monotonic(pd.DataFrame({'A': [1.0, np.nan, 3.0]}))
+    with pytest.raises(AssertionError):
+        ck.is_monotonic(pd.DataFrame({'A': ['a', None, 'c']}))
+    with pytest.raises(AssertionError):
+        ck.is_monotonic(pd.DataFrame({'A': [2, 2]}), strict=True)
+
+def test_stacked_decorators():
+    df = pd.DataFrame({'A': [1, 2, 3], 'B': [1.0, 2.0, 3.0]})
+    calls = []
+
+    def f(df):
+        calls.append(df)
+        return df
+
+    stacked = dc.none_missing()(
+        dc.within_range({'A': (0, 10)})(
+            dc.unique(['A'])(
+                dc.within_set({'A': [1, 2, 3]})(
+                    dc.one_to_many('B', 'A')(f)))))
+    assert stacked.__wrapped__ is f  # merged into a single wrapper
+    tm.assert_frame_equal(df, stacked(df))
+    assert len(calls) == 1
+
+    with pytest.raises(AssertionError, match='Not in set'):
+        stacked(df.assign(A=[1, 2, 30]))
+    with pytest.raises(AssertionError, match='non-unique'):
+        stacked(df.assign(A=[1, 2, 2], B=[1.0, 2.0, 2.0]))
+    with pytest.raises(AssertionError, match='missing'):
+        stacked(df.assign(B=[1.0, np.nan, 3.0]))
+
+    # a foreign decorator in between is not bypassed
+    def foreign(func):
+        def wrapper(*args, **kwargs):
+            calls.append('foreign')
+            return func(*args, **kwargs)
+        return wrapper
+    outer = dc.none_missing()(foreign(dc.unique()(f)))
+    tm.assert_frame_equal(df, outer(df))
+    assert calls[-2:-1] == ['foreign']
+
+def test_policies():
+    from engarde import policies
+    bad = pd.DataFrame({'A': [1, np.nan]})
+
+    every = policies.Every(3)
+    f = dc.none_missing(policy=every)(dc.unique(policy=every)(_noop))
+    outcomes = []
+    for _ in range(6):
+        try:
+            f(bad)
+            outcomes.append(True)
+        except AssertionError:
+            outcomes.append(False)
+    assert outcomes == [False, True, True, False, True, True]
+    assert (every.calls, every.checked, every.skipped) == (6, 2, 4)
+
+    interval = policies.Interval(3600)
+    f = dc.none_missing(policy=interval)(_noop)
+    with pytest.raises(AssertionError):
+        f(bad)
+    f(bad)
+    assert interval.skipped == 1
+    interval.reset()
+    with pytest.raises(AssertionError):
+        f(bad)
+
+    first = policies.PerSignature()
+    f = dc.none_missing(policy=first)(_noop)
+    with pytest.raises(AssertionError):
+        f(bad)
+    f(bad.iloc[::-1])
+    with pytest.raises(AssertionError):
+        f(bad.astype(object))
+    with pytest.raises(AssertionError):
+        f(bad.rename(columns={'A': 'B'}))
+    assert repr(first) == 'PerSignature(calls=4, checked=3, skipped=1)'
+
+    by_rows = policies.PerSignature(rows=True)
+    g = dc.none_missing(policy=by_rows)(lambda df, n: df)
+    for df in [bad, bad, bad.iloc[:1], bad.iloc[:1]]:
+        try:
+            g(df, 2)
+        except AssertionError:
+            pass
+    assert (by_rows.calls, by_rows.checked) == (4, 2)
+
+    # checks without a policy run on every call
+    f = dc.none_missing(policy=policies.Every(100))(dc.unique()(_noop))
+    f(pd.DataFrame({'A': [1, 2]}))
+    f(bad)
+    with pytest.raises(AssertionError):
+        f(pd.DataFrame({'A': [1, 1]}))
+
+def test_async_decorators():
+    import asyncio
+    good, bad = pd.DataFrame({'A': [1, 2]}), pd.DataFrame({'A': [1, np.nan]})
+
+    @dc.none_missing()
+    @dc.unique()
+    async def load(df):
+        await asyncio.sleep(0)
+        return df
+
+    @dc.none_missing()
+    async def stream(frames):
+        for df in frames:
+            yield df
+
+    async def collect(frames):
+        return [df async for df in stream(frames)]
+
+    assert load.__wrapped__.__name__ == 'load'
+    tm.assert_frame_equal(good, asyncio.run(load(good)))
+    with pytest.raises(AssertionError, match='missing'):
+        asyncio.run(load(bad))
+    assert len(asyncio.run(collect([good, good]))) == 2
+    with pytest.raises(AssertionError, match='missing'):
+        asyncio.run(collect([good, bad]))
+
+    @dc.none_missing(mode='background')
+    async def load_later(df):
+        return df
+
+    async def load_and_wait(df):
+        await load_later(df)
+        engarde.wait()
+
+    asyncio.run(load_and_wait(good))
+    with pytest.raises(AssertionError, match='missing'):
+        asyncio.run(load_and_wait(bad))
+
+def test_background():
+    import threading
+    good, bad = pd.DataFrame({'A': [1, 2]}), pd.DataFrame({'A': [1, np.nan]})
+    release = threading.Event()
+
+    def slow(df):
+        release.wait(5)
+        return True
+
+    assert ck.none_missing(bad, mode='background') is bad
+    with pytest.raises(AssertionError, match='missing'):
+        engarde.wait()
+    engarde.wait()  # failures are raised once
+
+    assert ck.verify_df(good, slow, mode='background') is good
+    release.set()
+    engarde.wait()
+
+    f = dc.none_missing(mode='background')(dc.unique()(_noop))
+    with pytest.raises(AssertionError, match='non-unique'):
+        f(pd.DataFrame({'A': [1, 1]}))  # unique still runs immediately
+    tm.assert_frame_equal(bad, f(bad))
+    import concurrent.futures
+    concurrent.futures.wait(engarde._background._pending.get())
+    with pytest.raises(AssertionError, match='missing'):
+        f(good)  # raised at the next decorated call
+
+    with pytest.raises(AssertionError, match='missing'):
+        with engarde.background():
+            ck.unique(bad)
+            ck.none_missing(bad)
+    with engarde.background():
+        ck.none_missing(good, mode='sync')
+
+    # stacked checks holding frames
+    f = dc.is_same_as(bad, mode='background')(dc.is_same_as(good)(_noop))
+    tm.assert_frame_equal(good, f(good))
+    with pytest.raises(AssertionError, match='not equal'):
+        engarde.wait()
+
+    # all failures are raised together
+    ck.none_missing(bad, mode='background')
+    ck.unique(pd.DataFrame({'A': [1, 1]}), mode='background')
+    with pytest.raises(ValidationError, match='2 background checks failed') as exc:
+        engarde.wait()
+    assert len(exc.value.errors) == 2
+    engarde.wait()
+
+    # failures of other threads are not raised here
+    thread = threading.Thread(target=ck.none_missing, args=(bad,), kwargs={'mode': 'background'})
+    thread.start()
+    thread.join()
+    with engarde.background():
+        ck.none_missing(good)
+    engarde.wait()
+    with pytest.raises(ValueError):
+        ck.none_missing(good, mode='later')
+
+def test_shared_intermediates():
+    df = pd.DataFrame({'A': [1, 2, 3], 'B': ['x', 'y', 'x'], 'C': [1.0, np.nan, 3.0]})
+    with generic.shared_intermediates(df) as cache:
+        ck.unique(df, ['A'])
+        ck.within_set(df, {'A': [1, 2, 3], 'B': ['x', 'y']})
+        ck.within_range(df, {'A': (1, 3), 'C': (0, 5)})
+        ck.within_n_std(df)
+        with pytest.raises(AssertionError):
+            ck.none_missing(df)
+        with pytest.raises(AssertionError):
+            ck.unique(df, ['B'])
+        with pytest.raises(AssertionError):
+            ck.within_set(df, {'C': [1.0, 3.0]})
+        ck.within_set(df, {'C': [1.0, 3.0, np.nan]})
+        ck.unique(df, ['C'])
+        ck.one_to_many(df, 'B', 'A')
+        assert set(cache._factorized) == {'A', 'B', 'C'}
+        assert ('min', 'A') in cache._reductions
+        assert 'C' in cache._isnull
+
 def test_is_shape():
     shape = 10, 2
     ig_0 = -1, 2
@@ -169,6 +419,29 @@ def test_unique():
         dc.unique()(_noop)(df)
 
 
+def test_unique_report():
+    df = pd.DataFrame({'A': [1, 2, 1, 2, 3], 'B': list('abcdb'), 'C': [1.0, 2, 3, 4, 5]},
+                      index=list('vwxyz'))
+    with pytest.raises(AssertionError, match="first duplicate 1 at row 'x'"):
+        ck.unique(df)
+    with pytest.raises(AssertionError) as exc:
+        ck.unique(df, report=True)
+    msg = str(exc.value)
+    assert "'A' contains 2 duplicated value(s): [1, 2]" in msg
+    assert "'B' contains 1 duplicated value(s): ['b']" in msg
+    assert "'C'" not in msg
+    tm.assert_frame_equal(df, dc.unique(columns=['C'], report=True)(_noop)(df))
+
+def test_unique_sorted():
+    df = pd.DataFrame({'A': [1, 2, 3, 3], 'B': [1.0, 2.0, np.nan, np.nan],
+                       'C': pd.date_range('2017-01-01', periods=4)})
+    tm.assert_frame_equal(df, ck.unique(df, columns=['C'], assume_sorted=True))
+    for col in ['A', 'B']:
+        with pytest.raises(AssertionError, match='at row 3'):
+            ck.unique(df, columns=[col], assume_sorted=True)
+        with pytest.raises(AssertionError, match='at row 3'):
+            ck.unique(df, columns=[col])
+
 def test_unique_index():
     df = pd.DataFrame([1, 2, 3], index=['a', 'b', 'c'])
     tm.assert_frame_equal(df, ck.unique_index(df))
@@ -179,6 +452,8 @@ def test_unique_index():
         ck.unique_index(df.reindex(['a', 'a', 'b']))
     with pytest.raises(AssertionError):
         dc.unique_index()(_add_n)(df.reindex(['a', 'a', 'b']))
+    with pytest.raises(AssertionError, match=r"1 duplicated label\(s\): \['a'\]"):
+        ck.unique_index(df.reindex(['a', 'a', 'b']))
 
 def test_within_set():
     df = pd.DataFrame({'A': [1, 2, 3], 'B': ['a', 'b', 'c']})
@@ -196,6 +471,38 @@ def test_within_set():
     with pytest.raises(AssertionError):
         dc.within_set(items=items)(_noop)(df)
 
+def test_within_set_dtypes():
+    df = pd.DataFrame({'A': [1.0, np.nan, 3.0], 'B': ['a', None, 'c'],
+                       'C': pd.Categorical(['x', 'y', np.nan]),
+                       'D': pd.date_range('2017-01-01', periods=3)})
+    items = {'A': {1, 3, np.nan}, 'B': ['a', 'c', None], 'C': ['x', 'y', np.nan],
+             'D': pd.date_range('2017-01-01', periods=4)}
+    tm.assert_frame_equal(df, ck.within_set(df, items))
+    tm.assert_frame_equal(df, dc.within_set(items)(_noop)(df))
+
+    for col, values in [('A', [1, 3]), ('B', ['a', 'c']), ('C', ['x', 'y']),
+                        ('D', pd.date_range('2017-01-02', periods=3))]:
+        with pytest.raises(AssertionError):
+            ck.within_set(df, {col: values})
+
+def test_value_set():
+    allowed = generic.ValueSet([3, 1, 2, 2])
+    assert len(allowed) == 3
+    result = allowed.contains(pd.Series([0, 1, 2.0, 3, 4, 2.5]))
+    np.testing.assert_array_equal(result, [False, True, True, True, False, False])
+    assert not generic.ValueSet([]).contains(pd.Series([1])).any()
+
+    allowed = generic.ValueSet(allowed)
+    with pytest.raises(AssertionError) as exc:
+        ck.within_set(pd.DataFrame({'A': [1, 5]}), {'A': allowed})
+    assert exc.value.args[1].tolist() == [5]
+
+    # categoricals without categories
+    empty = pd.DataFrame({'A': pd.Categorical([np.nan, np.nan])})
+    with pytest.raises(AssertionError, match='Not in set'):
+        ck.within_set(empty, {'A': ['a']})
+    tm.assert_frame_equal(empty, ck.within_set(empty, {'A': ['a', np.nan]}))
+
 def test_within_range():
     df = pd.DataFrame({'A': [-1, 0, 1]})
     items = {'A': (-1, 1)}
@@ -208,6 +515,18 @@ def test_within_range():
     with pytest.raises(AssertionError):
         dc.within_range(items)(_noop)(df)
 
+def test_within_range_report():
+    df = pd.DataFrame({'A': [-1, 0, 1], 'B': [1.0, np.nan, 5.0],
+                       'C': pd.date_range('2017-01-01', periods=3)})
+    items = {'A': (-1, 1), 'B': (0, 5),
+             'C': (pd.Timestamp('2017-01-01'), pd.Timestamp('2017-01-03'))}
+    tm.assert_frame_equal(df, ck.within_range(df, items))
+
+    items['B'] = (2, 5)
+    with pytest.raises(AssertionError) as exc:
+        ck.within_range(df, items)
+    assert exc.value.args[1].tolist() == [True, False, False]
+
 def test_within_n_std():
     df = pd.DataFrame({'A': np.arange(10), 'B': list('abcde')*2})
     tm.assert_frame_equal(df, ck.within_n_std(df))
@@ -218,6 +537,33 @@ def test_within_n_std():
     with pytest.raises(AssertionError):
         dc.within_n_std(.5)(_noop)(df)
 
+def test_bad_locations():
+    mask = pd.DataFrame({'A': [False, True, True], 'B': [True, False, False]},
+                        index=list('xyz'))
+    bad = generic.bad_locations(mask, limit=2)
+    assert len(bad) == 3
+    assert list(bad) == [('y', 'A'), ('z', 'A'), ('x', 'B')]
+    assert bad.labels(1) == [('y', 'A')]
+    assert repr(bad) == "3 bad location(s): [('y', 'A'), ('z', 'A')] and 1 more"
+
+    assert len(generic.bad_locations(mask & False)) == 0
+
+
+def test_within_n_std_reference():
+    df = pd.DataFrame({'A': [0.0, 1.0, 2.0, np.nan], 'B': [10, 11, 12, 13]})
+    means, stds = {'A': 1.0, 'B': 11.5}, {'A': 1.0, 'B': 10.0}
+    tm.assert_frame_equal(df, ck.within_n_std(df, 2, means=means, stds=stds))
+
+    with pytest.raises(AssertionError) as exc:
+        ck.within_n_std(df, .5, means=means, stds=stds)
+    assert list(exc.value.args[0]) == [(0, 'A'), (2, 'A')]
+
+    with pytest.raises(AssertionError):
+        ck.within_n_std(df, 2, means={'B': 0.0}, stds={'B': 1.0})
+    tm.assert_frame_equal(df, dc.within_n_std(2, means=means, stds=stds)(_noop)(df))
+    with pytest.raises(AssertionError):
+        dc.within_n_std(2, means={'B': 0.0}, stds={'B': 1.0})(_noop)(df)
+
 def test_has_dtypes():
     df = pd.DataFrame({'A': np.random.randint(0, 10, 10),
                        'B': np.random.randn(10),
@@ -256,6 +602,169 @@ def test_has_dtypes_funcs():
         dc.has_dtypes(items={'A': pat.is_bool_dtype})(_noop)(df)
 
 
+def test_has_dtypes_infer():
+    df = pd.DataFrame({'A': list('abcdefghij'), 'B': [1.5] * 9 + ['x']})
+    tm.assert_frame_equal(df, ck.has_dtypes(df, {'A': 'string', 'B': 'mixed'}))
+    tm.assert_frame_equal(df, ck.has_dtypes(df, {'A': 'string'}, cache=True))
+    tm.assert_frame_equal(df, dc.has_dtypes({'A': 'string'}, sample=3)(_noop)(df))
+    with pytest.raises(AssertionError):
+        ck.has_dtypes(df, {'B': 'floating'})
+
+    # reassigning the column invalidates the cached inference
+    df['A'] = [1] * 9 + ['a']
+    with pytest.raises(AssertionError):
+        ck.has_dtypes(df, {'A': 'string'}, cache=True)
+
+    # in-place edits are caught unless the cache is enabled
+    df['A'] = list('abcdefghij')
+    ck.has_dtypes(df, {'A': 'string'})
+    df.loc[2, 'A'] = 5
+    with pytest.raises(AssertionError):
+        ck.has_dtypes(df, {'A': 'string'})
+
+
+def test_has_dtypes_cache_threads():
+    from concurrent.futures import ThreadPoolExecutor
+    df = pd.DataFrame({i: list('abcdefghij') for i in range(50)})
+    with ThreadPoolExecutor(4) as pool:
+        futures = [pool.submit(ck.has_dtypes, df, 'string', cache=True, n_jobs=4)
+                   for _ in range(20)]
+    for future in futures:
+        tm.assert_frame_equal(df, future.result())
+
+
+def test_sample():
+    df = pd.DataFrame({'A': np.arange(1000), 'B': ['x'] * 999 + ['y'],
+                       'C': [1] * 999 + [0]})
+    tm.assert_frame_equal(df, ck.unique(df, ['A'], sample=0.1, seed=0))
+    tm.assert_frame_equal(df, ck.within_set(df, {'B': ['x']}, sample=50, seed=0))
+    tm.assert_frame_equal(df, dc.unique(['A'], sample=100)(_noop)(df))
+    tm.assert_frame_equal(df, ck.verify_rows(df, 'C > 0', sample=10, seed=0))
+    tm.assert_frame_equal(df, ck.has_dtypes(df, {'B': 'string'}, sample=0.5))
+    with pytest.raises(AssertionError, match="sample of 10 of 1000 rows"):
+        ck.has_dtypes(df, {'B': 'integer'}, sample=10)
+
+    # stratified samples contain every value of the column
+    with pytest.raises(AssertionError, match=r"sample of \d+ of 1000 rows"):
+        ck.within_set(df, {'B': ['x']}, sample=10, seed=0, stratify='B')
+    with pytest.raises(AssertionError):
+        dc.verify_rows(lambda row: row.C > 0, sample=10, stratify='C')(_noop)(df)
+    with pytest.raises(AssertionError) as exc:
+        ck.within_set(df, {'B': ['x']}, sample=10, stratify='B', escalate=True)
+    assert exc.value.args[0] == 'Not in set'
+    with pytest.raises(AssertionError, match="non-unique"):
+        ck.unique(df, ['B'], sample=1.0)
+
+    with pytest.raises(ValueError):
+        ck.unique(df, sample=1.5)
+    with pytest.raises(ValueError):
+        ck.unique(df, sample=0)
+
+
+def test_sample_bound(caplog):
+    df = pd.DataFrame({'A': np.arange(1000)})
+    with caplog.at_level('INFO', logger='engarde'):
+        ck.within_set(df, {'A': range(1000)}, sample=100, seed=1)
+    assert "sample of 100 of 1000 rows; failure rate < 2.95%" in caplog.text
+    caplog.clear()
+    with caplog.at_level('INFO', logger='engarde'):
+        ck.unique(df, sample=100, seed=1)
+    assert "unique passed on a random sample of 100 of 1000 rows" in caplog.text
+    assert "failure rate" not in caplog.text
+    assert generic._sampling.failure_rate_bound(0) == 1.0
+
+
+def test_n_jobs():
+    df = pd.DataFrame({i: np.arange(100) * (i + 1) for i in range(20)})
+    df[5] = 0
+    df[12] = -1
+    tm.assert_frame_equal(df, ck.is_monotonic(df, n_jobs=4))
+    tm.assert_frame_equal(df, ck.within_range(df, {i: (-1, 2000) for i in df}, n_jobs=4))
+    tm.assert_frame_equal(df, ck.has_dtypes(df, 'int64', n_jobs=-1))
+    tm.assert_frame_equal(df, ck.within_set(df, {0: range(100), 5: [0]}, n_jobs=2))
+    # the failure of the first failing column is raised
+    with pytest.raises(AssertionError, match="Column 5 "):
+        ck.unique(df, n_jobs=4)
+    with pytest.raises(AssertionError, match=r"(?s)Column 5 .*Column 12 "):
+        ck.unique(df, report=True, n_jobs=4)
+    with pytest.raises(AssertionError, match="Column 5 "):
+        ck.is_monotonic(df, increasing=True, strict=True, n_jobs=3)
+
+    engarde.set_n_jobs(4)
+    try:
+        with pytest.raises(AssertionError, match="Column 5 "):
+            dc.unique()(_noop)(df)
+        assert generic._parallel.resolve_n_jobs(None) == 4
+    finally:
+        engarde.set_n_jobs(1)
+    with pytest.raises(ValueError):
+        engarde.set_n_jobs(0)
+
+
+def test_chunked(monkeypatch):
+    monkeypatch.setattr(generic._parallel, '_MIN_CHUNK', 10)
+    df = pd.DataFrame({'A': np.arange(100.0), 'B': pd.Categorical(['x', 'y'] * 50)})
+    for n_jobs in [1, 3, 8]:
+        tm.assert_frame_equal(df, ck.none_missing(df, n_jobs=n_jobs))
+        tm.assert_frame_equal(df, ck.all_finite(df, n_jobs=n_jobs))
+        tm.assert_frame_equal(df, ck.within_range(df, {'A': (0, 99)}, n_jobs=n_jobs))
+        tm.assert_frame_equal(df, ck.within_set(df, {'B': ['x', 'y']}, n_jobs=n_jobs))
+        tm.assert_frame_equal(df, ck.is_monotonic(df, {'A': (True, True)}, n_jobs=n_jobs))
+
+        bad = df.copy()
+        bad.loc[[33, 34, 67], 'A'] = [np.nan, np.inf, 33.0]
+        with pytest.raises(AssertionError, match=r"1 missing value\(s\), first at rows \[33\]"):
+            ck.none_missing(bad, n_jobs=n_jobs)
+        with pytest.raises(AssertionError, match=r"2 non-finite value\(s\), first at rows \[33, 34\]"):
+            ck.all_finite(bad, n_jobs=n_jobs)
+        with pytest.raises(AssertionError, match="Outside range"):
+            ck.within_range(bad, {'A': (0, 100)}, n_jobs=n_jobs)
+        with pytest.raises(AssertionError, match="Outside range"):
+            ck.within_range(df, {'A': (0, 98)}, n_jobs=n_jobs)
+        with pytest.raises(AssertionError, match="Not in set"):
+            ck.within_set(df, {'B': ['x']}, n_jobs=n_jobs)
+
+        # a violation on the boundary between two chunks
+        step = df.assign(A=np.r_[np.arange(50.0), np.arange(50.0)])
+        with pytest.raises(AssertionError, match="first violation at row 50"):
+            ck.is_monotonic(step, {'A': (True, False)}, n_jobs=n_jobs)
+    with pytest.raises(TypeError):
+        ck.all_finite(df, ['B'])
+
+
+def test_schema():
+    import pickle
+    from engarde.schema import Column
+    df = pd.DataFrame({'id': [1, 2, 3], 'price': [1.0, 2.5, 3.0],
+                       'state': ['CA', 'NY', 'CA'], 'dept': ['a', 'b', 'a']})
+    schema = engarde.Schema({
+        'id': Column('int64', unique=True, nullable=False, monotonic='increasing',
+                     strict=True),
+        'price': Column('float64', within_range=(0, 10), finite=True),
+        'state': Column(within_set=['CA', 'NY'], nullable=False),
+    }, unique_index=True, checks=[(ck.one_to_many, ('state', 'dept'), {})])
+    checks = [check for check, _, _ in schema.plan]
+    assert checks == [ck.has_dtypes, ck.unique_index, ck.none_missing, ck.all_finite,
+                      ck.within_range, ck.within_set, ck.is_monotonic, ck.one_to_many]
+    assert schema.plan[2][2] == {'columns': ['state']}
+
+    tm.assert_frame_equal(df, schema.validate(df))
+    tm.assert_frame_equal(df, df.pipe(schema, n_jobs=2))
+    restored = pickle.loads(pickle.dumps(schema))
+    tm.assert_frame_equal(df, restored.validate(df))
+
+    for bad, match in [(df.assign(id=[1, 3, 3]), 'not increasing'),
+                       (df.assign(price=[1.0, np.inf, 3.0]), 'non-finite'),
+                       (df.assign(state=['CA', 'TX', None]), 'missing'),
+                       (df.assign(id=[1.0, 2.0, 3.0]), 'dtype'),
+                       (df.drop(columns='price'), 'Missing columns'),
+                       (df.assign(dept=['a', 'a', 'a']), 'multiple values')]:
+        with pytest.raises(AssertionError, match=match):
+            restored.validate(bad)
+    with pytest.raises(AssertionError, match='Unexpected columns'):
+        engarde.Schema({'id': Column()}, strict=True).validate(df)
+
+
 def test_one_to_many():
     df = pd.DataFrame({
         'parameter': ['Cu', 'Cu', 'Pb', 'Pb'],
@@ -276,6 +785,38 @@ def test_one_to_many_raises():
         ck.one_to_many(df, 'units', 'parameter')
 
 
+def test_one_to_many_report():
+    df = pd.DataFrame({
+        'parameter': ['Cu', 'Cu', 'Pb', 'Pb', 'Zn', np.nan, np.nan],
+        'units': ['ug/L', 'mg/L', 'ug/L', 'ug/L', 'ug/L', 'ug/L', 'mg/L'],
+    })
+    with pytest.raises(AssertionError) as exc:
+        ck.one_to_many(df, 'units', 'parameter')
+    msg = str(exc.value)
+    assert "'Cu' in parameter has multiple values for units: ['ug/L', 'mg/L']" in msg
+    assert 'Pb' not in msg and 'nan' not in msg
+
+    with pytest.raises(AssertionError):
+        ck.many_to_one(df, 'parameter', 'units')
+    with pytest.raises(AssertionError):
+        dc.one_to_many('units', 'parameter')(_noop)(df)
+
+
+def test_one_to_one():
+    df = pd.DataFrame({'code': [1, 2, 3, 1], 'name': ['a', 'b', 'c', 'a']})
+    tm.assert_frame_equal(df, ck.one_to_one(df, 'code', 'name'))
+    tm.assert_frame_equal(df, dc.one_to_one('code', 'name')(_noop)(df))
+    tm.assert_frame_equal(df, ck.many_to_one(df, 'code', 'name'))
+    tm.assert_frame_equal(df, dc.many_to_one('code', 'name')(_noop)(df))
+
+    df = pd.DataFrame({'code': [1, 2, 3], 'name': ['a', 'b', 'b']})
+    tm.assert_frame_equal(df, ck.many_to_one(df, 'code', 'name'))
+    with pytest.raises(AssertionError):
+        ck.one_to_one(df, 'code', 'name')
+    with pytest.raises(AssertionError):
+        dc.one_to_one('code', 'name')(_noop)(df)
+
+
 def test_verify_df():
     f = lambda x, n: len(x) > n
     df = pd.DataFrame({'A': [1, 2, 3]})
@@ -290,6 +831,48 @@ def test_verify_df():
         ck.verify_df(df, f, n=4)
         dc.verify(f, n=4)(_noop)(df)
 
+def test_validation_error():
+    import gc
+    import pickle
+
+    df = pd.DataFrame({'A': np.arange(20)})
+    with pytest.raises(ValidationError) as exc:
+        ck.verify_df(df, lambda x: len(x) > 50)
+    assert exc.value.check == '<lambda>'
+    assert exc.value.shape == (20, 1)
+    assert exc.value.frame is df
+    assert exc.value.args == ('<lambda> is not true',)
+
+    with pytest.raises(ValidationError) as exc:
+        ck.verify_rows(df, 'A > 3')
+    err = exc.value
+    assert err.n_bad == 4
+    tm.assert_frame_equal(err.sample, df.iloc[:4])
+
+    with pytest.raises(ValidationError) as exc:
+        ck.verify_rows(df, lambda row: row.A % 2 == 0)
+    assert exc.value.n_bad == 10
+    assert len(exc.value.sample) == 10
+
+    # the sample is capped even when index labels are duplicated
+    dup = pd.DataFrame({'A': np.arange(1000)}, index=np.zeros(1000, dtype=int))
+    with pytest.raises(ValidationError, match=r"\[0, 0, 0, 0, 0, 0, 0, 0, 0, 0\] and 990 more") as exc:
+        ck.verify_rows(dup, lambda row: row.A < 0)
+    assert exc.value.sample.shape == (10, 1)
+    with pytest.raises(ValidationError) as exc:
+        ck.verify_rows(dup, 'A < 0', rows=slice(None))
+    assert exc.value.sample.shape == (10, 1)
+
+    restored = pickle.loads(pickle.dumps(err))
+    assert restored.n_bad == 4 and restored.frame is None
+    assert str(restored) == str(err)
+
+    # once the traceback is dropped, nothing keeps the frame alive
+    err.__traceback__ = None
+    del df, exc
+    gc.collect()
+    assert err.frame is None
+
 def test_verify_columns():
     f = lambda x, n: (x > n).all()
     df = pd.DataFrame({'A': [1, 2, 3]})
@@ -300,6 +883,22 @@ def test_verify_columns():
         ck.verify_columns(df, f, n=2)
         dc.verify_columns(f, n=2)(df)
 
+def test_verify_columns_reductions():
+    df = pd.DataFrame({'A': [1, 2, 3], 'B': [1.0, np.nan, 0.5], 'C': [True, True, False]})
+    for func in [np.all, 'all', np.amin, np.nanmin, 'min']:
+        tm.assert_frame_equal(df, ck.verify_columns(df, func, columns=['A', 'B']))
+        with pytest.raises(AssertionError, match=r"\['C'\]"):
+            ck.verify_columns(df, func)
+        with pytest.raises(AssertionError, match=r"\['C'\]"):
+            ck.verify_columns(df, func, columns=['B', 'C'])
+        with pytest.raises(AssertionError, match=r"\['C'\]"):
+            ck.verify_columns(df, func, columns=slice('B', None))
+    tm.assert_frame_equal(df, ck.verify_columns(df, np.any, how='all'))
+    tm.assert_frame_equal(df, dc.verify_columns(np.sum)(_noop)(df))
+    tm.assert_frame_equal(df, ck.verify_rows(df, 'all', rows=[0, 1]))
+    with pytest.raises(AssertionError):
+        ck.verify_rows(df, np.all)
+
 def test_verify_rows():
     f = lambda x, n: (x.A > n)
     df = pd.DataFrame({'A': [1, 2, 3], 'B':list('abc')})
@@ -311,6 +910,129 @@ def test_verify_rows():
         dc.verify_rows(f, n=2)(df)
 
 
+def test_verify_rows_traced():
+    df = pd.DataFrame({'A': [1, 2, 3], 'B': [0, 1, 5], 'name': list('abc')})
+    calls = []
+
+    def f(row, n):
+        calls.append(row)
+        return (row.A + n > row['B']) & (row.B >= 0)
+
+    tm.assert_frame_equal(df, ck.verify_rows(df, f, 3))
+    assert len(calls) == 1  # traced once, evaluated on whole columns
+
+    del calls[:]
+    with pytest.raises(AssertionError, match=r"\[2\]"):
+        ck.verify_rows(df, f, n=1)
+    with pytest.raises(AssertionError, match=r"\[2\]"):
+        ck.verify_rows(df, f, n=1, vectorize=False)
+    assert len(calls) == 1 + 3
+
+    # untraceable predicates are evaluated row by row
+    for g in [lambda row: row.A > row.B > -1,
+              lambda row: row.name in (0, 1),
+              lambda row: str(row.A) != '3',
+              lambda row: row.size == 3 and row.A < 3]:
+        tm.assert_frame_equal(df.iloc[:2], ck.verify_rows(df.iloc[:2], g))
+        with pytest.raises(AssertionError):
+            ck.verify_rows(df, g)
+
+
+def test_numba_engine():
+    pytest.importorskip('numba')
+    df = pd.DataFrame({'A': [1, 2, 3], 'B': [0.5, 1.5, np.nan], 'C': list('abc')})
+
+    f = lambda row, n: row.A > n
+    tm.assert_frame_equal(df, ck.verify_rows(df, f, 0, engine='numba'))
+    with pytest.raises(AssertionError, match=r"\[0\]"):
+        ck.verify_rows(df, f, 1, engine='numba')
+    with pytest.raises(AssertionError):
+        dc.verify_rows(f, 1, engine='numba')(_noop)(df)
+
+    g = lambda values: np.nanmin(values) > 0
+    tm.assert_frame_equal(df, ck.verify_columns(df, g, columns=['A', 'B'], engine='numba'))
+    with pytest.raises(AssertionError):
+        ck.verify_columns(df.assign(A=[0, 1, 2]), g, columns=['A'], engine='numba')
+
+    tm.assert_frame_equal(df, ck.is_monotonic(df, items={'A': (None, True)}, engine='numba'))
+    with pytest.raises(AssertionError, match='row 2'):
+        ck.is_monotonic(df, items={'B': (True, False)}, engine='numba')
+    tm.assert_frame_equal(df, ck.within_range(df, {'A': (1, 3), 'B': (0, 2)}, engine='numba'))
+    with pytest.raises(AssertionError):
+        ck.within_range(df, {'B': (1, 2)}, engine='numba')
+    with pytest.raises(AssertionError):  # exact for integers beyond float precision
+        ck.within_range(pd.DataFrame({'id': [2 ** 62 + 1]}), {'id': (0, 2 ** 62)},
+                        engine='numba')
+    all_nan = pd.DataFrame({'A': [np.nan, np.nan]})
+    tm.assert_frame_equal(all_nan, ck.within_range(all_nan, {'A': (0, 1)}, engine='numba'))
+    tm.assert_frame_equal(df, ck.unique(df, engine='numba'))
+    with pytest.raises(AssertionError, match='row 2'):
+        ck.unique(pd.DataFrame({'A': [1.0, np.nan, np.nan]}), engine='numba')
+    with pytest.raises(ValueError):
+        ck.unique(df, engine='cython')
+
+
+def test_verify_rows_workers():
+    df = pd.DataFrame({'A': np.arange(20), 'B': list('ab') * 10,
+                       'C': pd.date_range('2017-01-01', periods=20)})
+    f = lambda row, n: row.B in ('a', 'b') and row.A < n  # untraceable
+
+    tm.assert_frame_equal(df, ck.verify_rows(df, f, 20, workers=2))
+    with pytest.raises(AssertionError, match=r"\[18, 19\]"):
+        ck.verify_rows(df, f, n=18, workers=2)
+    tm.assert_frame_equal(df, ck.verify_rows(df, f, 19, rows=slice(0, 18), workers=3))
+    tm.assert_frame_equal(df, dc.verify_rows(f, 20, workers=2)(_noop)(df))
+
+    # extension dtypes keep their type in the workers
+    tz = df.assign(C=pd.date_range('2017-01-01', periods=20, tz='US/Eastern'))
+    start = pd.Timestamp('2016-12-31', tz='US/Eastern')
+    g = lambda row: row.C > start and row.B in ('a', 'b')
+    tm.assert_frame_equal(tz, ck.verify_rows(tz, g, workers=2))
+
+    # concurrent evaluations don't see each other's predicate
+    import threading
+    errors = []
+
+    def run(n):
+        try:
+            ck.verify_rows(df, f, n, workers=2)
+        except AssertionError as exc:
+            errors.append((n, exc))
+    threads = [threading.Thread(target=run, args=(n,)) for n in (20, 18)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert [n for n, _ in errors] == [18]
+
+
+def test_verify_rows_expression():
+    df = pd.DataFrame({'A': [1, 2, 3, 4], 'B': [0, 1, 5, 3], 'C': [1.0, 2.0, np.nan, 4.0]},
+                      index=list('abcd'))
+    tm.assert_frame_equal(df, ck.verify_rows(df, 'A > B', rows=['a', 'b', 'd']))
+    tm.assert_frame_equal(df, ck.verify_rows(df, 'A > B', how='any'))
+    tm.assert_frame_equal(df, ck.verify_rows(df, 'B < @n', local_dict={'n': 6}))
+    tm.assert_frame_equal(df, dc.verify_rows('A > 0')(_noop)(df))
+    # aggregation names are not expressions
+    tm.assert_frame_equal(df, ck.verify_rows(df, 'nunique'))
+    tm.assert_frame_equal(df[['A', 'B']], ck.verify_rows(df[['A', 'B']], 'std'))
+
+    for chunksize in [None, 1, 3]:
+        with pytest.raises(AssertionError, match=r"1 rows .* first: \['c'\]"):
+            ck.verify_rows(df, 'A > B and C.notna()', chunksize=chunksize)
+    with pytest.raises(AssertionError):
+        ck.verify_rows(df, 'A > 10', how='any')
+    with pytest.raises(AssertionError):
+        dc.verify_rows('A > B', rows=['b', 'c'])(_noop)(df)
+
+    # engine and workers apply to callables; eval's engine goes through verify_expression
+    with pytest.raises(TypeError):
+        ck.verify_rows(df, 'A > 0', engine='numba')
+    with pytest.raises(TypeError):
+        ck.verify_rows(df, 'A > 0', workers=2)
+    tm.assert_frame_equal(df, generic.verify_expression(df, 'A > 0', engine='python'))
+
+
 def test_is_same_as():
     df = pd.DataFrame({'A': [1, 2, 3], 'B': [1, 2, 3]})
     df_equal = pd.DataFrame({'A': [1, 2, 3], 'B': [1, 2, 3]})
@@ -346,3 +1068,58 @@ def test_is_same_as_with_kwargs():
 
     result = dc.is_same_as(df_equal_float, check_dtype=False)(_noop)(df)
     tm.assert_frame_equal(df, result)
+
+def test_is_same_as_fast_path():
+    df = pd.DataFrame({'A': [1.0, np.nan, 3.0], 'B': ['a', None, 'c'],
+                       'C': pd.date_range('2017-01-01', periods=3),
+                       'D': pd.Categorical(['x', 'y', 'x'])})
+    tm.assert_frame_equal(df, ck.is_same_as(df, df.copy()))
+
+    other = df.copy()
+    other.loc[2, 'B'] = 'd'
+    with pytest.raises(AssertionError):
+        ck.is_same_as(df, other)
+    with pytest.raises(AssertionError):
+        ck.is_same_as(df, df.rename(columns={'A': 'Z'}))
+    with pytest.raises(AssertionError):
+        ck.is_same_as(df, df.set_axis([1, 2, 3], axis=0))
+    with pytest.raises(AssertionError):
+        ck.is_same_as(df, df.rename_axis('idx'))
+
+    # differences that assert_frame_equal sees but equality of the values doesn't
+    reordered = df.assign(D=df['D'].cat.reorder_categories(['y', 'x']))
+    with pytest.raises(AssertionError):
+        ck.is_same_as(df, reordered)
+    with pytest.raises(AssertionError):
+        ck.is_same_as(df.set_index('D'), reordered.set_index('D'))
+    daily = df.set_axis(pd.date_range('2017-01-01', periods=3), axis=0)
+    with pytest.raises(AssertionError):
+        ck.is_same_as(daily, daily.set_axis(pd.DatetimeIndex(daily.index.values), axis=0))
+
+
+def test_disabled():
+    df = pd.DataFrame({'A': [1, np.nan, 1]})
+    assert engarde.is_enabled()
+
+    with engarde.disabled():
+        assert not engarde.is_enabled()
+        decorated = dc.none_missing()(_noop)
+        assert decorated is _noop
+        assert ck.none_missing(df) is df
+        assert ck.unique(df) is df
+        assert ck.verify_rows(df, 'A > 5') is df
+        assert ck.verify_df(df, lambda x: False) is df
+        with engarde.enabled():
+            with pytest.raises(AssertionError):
+                ck.none_missing(df)
+    assert engarde.is_enabled()
+
+    # decorated while enabled, called while disabled
+    decorated = dc.none_missing()(_noop)
+    engarde.disable()
+    try:
+        assert decorated(df) is df
+    finally:
+        engarde.enable()
+    with pytest.raises(AssertionError):
+        decorated(df)